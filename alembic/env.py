@@ -35,6 +35,18 @@ target_metadata = Base.metadata
 # ... etc.
 
 
+def include_object(object, name, type_, reflected, compare_to):
+    # The SQLite full-text index and its shadow tables are managed by hand.
+    if type_ == "table" and name.startswith("empresas_busca"):
+        return False
+
+    # Dialect-specific indexes (e.g. the PostgreSQL trigram ones) only exist
+    # on the backend they were declared for.
+    ddl_if = getattr(object, "_ddl_if", None)
+
+    return ddl_if is None or ddl_if.dialect in (None, context.get_bind().dialect.name)
+
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
 
@@ -67,7 +79,11 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
-        context.configure(connection=connection, target_metadata=target_metadata)
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object,
+        )
 
         with context.begin_transaction():
             context.run_migrations()
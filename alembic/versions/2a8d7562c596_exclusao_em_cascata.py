@@ -0,0 +1,71 @@
+"""exclusao em cascata
+
+Revision ID: 2a8d7562c596
+Revises: 416acf6db7aa
+Create Date: 2026-10-18 02:05:12.118392
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "2a8d7562c596"
+down_revision: Union[str, None] = "416acf6db7aa"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# SQLite reflects its foreign keys without a name, so batch mode needs a
+# naming convention to find the one being replaced.
+NAMING_CONVENTION = {"fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s"}
+
+FOREIGN_KEYS = [
+    ("obrigacoes_acessorias", "empresa_id", "empresas"),
+    ("empresas_resumo", "empresa_id", "empresas"),
+    ("calendario_vencimentos", "obrigacao_id", "obrigacoes_acessorias"),
+]
+
+
+def recreate_foreign_key(table, column, referred, ondelete):
+    name = f"fk_{table}_{column}_{referred}"
+    existing = next(
+        foreign_key["name"]
+        for foreign_key in sa.inspect(op.get_bind()).get_foreign_keys(table)
+        if foreign_key["constrained_columns"] == [column]
+    )
+
+    with op.batch_alter_table(table, naming_convention=NAMING_CONVENTION) as batch_op:
+        batch_op.drop_constraint(existing or name, type_="foreignkey")
+        batch_op.create_foreign_key(name, referred, [column], ["id"], ondelete=ondelete)
+
+
+def upgrade() -> None:
+    # Earlier deletes nulled empresa_id instead of removing the obligations;
+    # SQLite never enforced the key, so dangling ids may exist as well.
+    op.execute(
+        """
+        DELETE FROM calendario_vencimentos WHERE obrigacao_id IN (
+            SELECT id FROM obrigacoes_acessorias
+            WHERE empresa_id IS NULL OR empresa_id NOT IN (SELECT id FROM empresas)
+        )
+        """
+    )
+    op.execute(
+        """
+        DELETE FROM obrigacoes_acessorias
+        WHERE empresa_id IS NULL OR empresa_id NOT IN (SELECT id FROM empresas)
+        """
+    )
+    op.execute("DELETE FROM empresas_resumo WHERE empresa_id NOT IN (SELECT id FROM empresas)")
+
+    for table, column, referred in FOREIGN_KEYS:
+        recreate_foreign_key(table, column, referred, "CASCADE")
+
+
+def downgrade() -> None:
+    for table, column, referred in reversed(FOREIGN_KEYS):
+        recreate_foreign_key(table, column, referred, None)
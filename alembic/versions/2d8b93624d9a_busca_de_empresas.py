@@ -0,0 +1,74 @@
+"""busca de empresas
+
+Revision ID: 2d8b93624d9a
+Revises: 7425a74871f6
+Create Date: 2026-10-18 01:38:58.741922
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "2d8b93624d9a"
+down_revision: Union[str, None] = "7425a74871f6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+EMPRESAS_BUSCA_SQLITE = [
+    "CREATE VIRTUAL TABLE empresas_busca USING fts5("
+    "nome, email, content='empresas', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE TRIGGER empresas_busca_ai AFTER INSERT ON empresas BEGIN "
+    "INSERT INTO empresas_busca (rowid, nome, email) VALUES (new.id, new.nome, new.email); END",
+    "CREATE TRIGGER empresas_busca_ad AFTER DELETE ON empresas BEGIN "
+    "INSERT INTO empresas_busca (empresas_busca, rowid, nome, email) "
+    "VALUES ('delete', old.id, old.nome, old.email); END",
+    "CREATE TRIGGER empresas_busca_au AFTER UPDATE OF nome, email ON empresas BEGIN "
+    "INSERT INTO empresas_busca (empresas_busca, rowid, nome, email) "
+    "VALUES ('delete', old.id, old.nome, old.email); "
+    "INSERT INTO empresas_busca (rowid, nome, email) VALUES (new.id, new.nome, new.email); END",
+    "INSERT INTO empresas_busca (empresas_busca) VALUES ('rebuild')",
+]
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+
+    if dialect == "postgresql":
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+        with op.get_context().autocommit_block():
+            for column in ("nome", "email"):
+                op.create_index(
+                    f"ix_empresas_{column}_trgm",
+                    "empresas",
+                    [column],
+                    unique=False,
+                    postgresql_using="gin",
+                    postgresql_ops={column: "gin_trgm_ops"},
+                    postgresql_concurrently=True,
+                )
+    elif dialect == "sqlite":
+        for statement in EMPRESAS_BUSCA_SQLITE:
+            op.execute(statement)
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+
+    if dialect == "postgresql":
+        with op.get_context().autocommit_block():
+            for column in ("email", "nome"):
+                op.drop_index(
+                    f"ix_empresas_{column}_trgm",
+                    table_name="empresas",
+                    postgresql_concurrently=True,
+                )
+    elif dialect == "sqlite":
+        for trigger in ("ai", "ad", "au"):
+            op.execute(f"DROP TRIGGER IF EXISTS empresas_busca_{trigger}")
+
+        op.execute("DROP TABLE IF EXISTS empresas_busca")
@@ -0,0 +1,129 @@
+"""cnpj normalizado
+
+Revision ID: 416acf6db7aa
+Revises: 2d8b93624d9a
+Create Date: 2026-10-18 01:44:36.485675
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "416acf6db7aa"
+down_revision: Union[str, None] = "2d8b93624d9a"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+BATCH_SIZE = 1000
+
+DIGITS = "replace(replace(replace(replace(cnpj, '.', ''), '/', ''), '-', ''), ' ', '')"
+
+DUPLICATES = sa.text(
+    f"""
+    SELECT {DIGITS} AS digits FROM empresas
+    WHERE {DIGITS} > :last
+    GROUP BY digits
+    HAVING COUNT(*) > 1
+    ORDER BY digits
+    LIMIT :limit
+    """
+)
+
+EMPRESAS_BY_CNPJ = sa.text(
+    f"SELECT id, {DIGITS} FROM empresas WHERE {DIGITS} IN :cnpjs ORDER BY id"
+).bindparams(sa.bindparam("cnpjs", expanding=True))
+
+MOVE_OBRIGACOES = sa.text(
+    "UPDATE obrigacoes_acessorias SET empresa_id = :survivor WHERE empresa_id = :duplicate"
+)
+
+DELETE_RESUMOS = sa.text("DELETE FROM empresas_resumo WHERE empresa_id IN :ids").bindparams(
+    sa.bindparam("ids", expanding=True)
+)
+
+RECOUNT_RESUMOS = sa.text(
+    """
+    UPDATE empresas_resumo SET
+        mensal = (
+            SELECT COUNT(*) FROM obrigacoes_acessorias
+            WHERE empresa_id = empresas_resumo.empresa_id AND periodicidade = 'MENSAL'
+        ),
+        trimestral = (
+            SELECT COUNT(*) FROM obrigacoes_acessorias
+            WHERE empresa_id = empresas_resumo.empresa_id AND periodicidade = 'TRIMESTRAL'
+        ),
+        anual = (
+            SELECT COUNT(*) FROM obrigacoes_acessorias
+            WHERE empresa_id = empresas_resumo.empresa_id AND periodicidade = 'ANUAL'
+        )
+    WHERE empresa_id IN :ids
+    """
+).bindparams(sa.bindparam("ids", expanding=True))
+
+DELETE_EMPRESAS = sa.text("DELETE FROM empresas WHERE id IN :ids").bindparams(
+    sa.bindparam("ids", expanding=True)
+)
+
+NORMALIZE = sa.text(
+    f"""
+    UPDATE empresas SET cnpj = {DIGITS}
+    WHERE id > :start AND id <= :end AND cnpj <> {DIGITS}
+    """
+)
+
+
+def deduplicate(bind):
+    # The oldest row of each CNPJ survives and inherits the obligations of the
+    # others. Every step is idempotent, so an interrupted run can be resumed.
+    last = ""
+
+    while cnpjs := bind.execute(DUPLICATES, {"last": last, "limit": BATCH_SIZE}).scalars().all():
+        survivors = {}
+        duplicates = {}
+
+        for empresa_id, cnpj in bind.execute(EMPRESAS_BY_CNPJ, {"cnpjs": cnpjs}):
+            if cnpj in survivors:
+                duplicates[empresa_id] = survivors[cnpj]
+            else:
+                survivors[cnpj] = empresa_id
+
+        bind.execute(
+            MOVE_OBRIGACOES,
+            [
+                {"survivor": survivor, "duplicate": duplicate}
+                for duplicate, survivor in duplicates.items()
+            ],
+        )
+        bind.execute(DELETE_RESUMOS, {"ids": list(duplicates)})
+        bind.execute(RECOUNT_RESUMOS, {"ids": list(survivors.values())})
+        bind.execute(DELETE_EMPRESAS, {"ids": list(duplicates)})
+
+        last = cnpjs[-1]
+
+
+def normalize(bind):
+    last_id = bind.execute(sa.text("SELECT MAX(id) FROM empresas")).scalar() or 0
+
+    for start in range(0, last_id, BATCH_SIZE):
+        bind.execute(NORMALIZE, {"start": start, "end": start + BATCH_SIZE})
+
+
+def upgrade() -> None:
+    # Each batch commits on its own so no statement holds locks on the whole
+    # table. Once every CNPJ is down to its digits, the unique index on cnpj
+    # is the unique index on the normalized value.
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+
+        deduplicate(bind)
+        normalize(bind)
+
+
+def downgrade() -> None:
+    # Merged empresas and stripped punctuation can't be restored.
+    pass
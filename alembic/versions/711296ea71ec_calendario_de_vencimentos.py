@@ -0,0 +1,56 @@
+"""calendario de vencimentos
+
+Revision ID: 711296ea71ec
+Revises: ce21c0ba16b8
+Create Date: 2026-10-18 01:33:47.707115
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "711296ea71ec"
+down_revision: Union[str, None] = "ce21c0ba16b8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("obrigacoes_acessorias") as batch_op:
+        batch_op.add_column(sa.Column("data_vencimento", sa.Date(), nullable=True))
+
+    op.create_table(
+        "calendario_dias",
+        sa.Column("mes", sa.Integer(), nullable=False),
+        sa.Column("dia", sa.Integer(), nullable=False),
+        sa.Column("data", sa.Date(), nullable=False),
+        sa.PrimaryKeyConstraint("mes", "dia"),
+    )
+    op.create_table(
+        "calendario_vencimentos",
+        sa.Column("data", sa.Date(), nullable=False),
+        sa.Column("obrigacao_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["obrigacao_id"], ["obrigacoes_acessorias.id"]),
+        sa.PrimaryKeyConstraint("data", "obrigacao_id"),
+    )
+    op.create_index(
+        op.f("ix_calendario_vencimentos_obrigacao_id"),
+        "calendario_vencimentos",
+        ["obrigacao_id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        op.f("ix_calendario_vencimentos_obrigacao_id"), table_name="calendario_vencimentos"
+    )
+    op.drop_table("calendario_vencimentos")
+    op.drop_table("calendario_dias")
+
+    with op.batch_alter_table("obrigacoes_acessorias") as batch_op:
+        batch_op.drop_column("data_vencimento")
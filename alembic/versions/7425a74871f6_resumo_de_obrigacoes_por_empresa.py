@@ -0,0 +1,48 @@
+"""resumo de obrigacoes por empresa
+
+Revision ID: 7425a74871f6
+Revises: 711296ea71ec
+Create Date: 2026-10-18 01:36:24.602523
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "7425a74871f6"
+down_revision: Union[str, None] = "711296ea71ec"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "empresas_resumo",
+        sa.Column("empresa_id", sa.Integer(), nullable=False),
+        sa.Column("mensal", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("trimestral", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("anual", sa.Integer(), server_default="0", nullable=False),
+        sa.ForeignKeyConstraint(["empresa_id"], ["empresas.id"]),
+        sa.PrimaryKeyConstraint("empresa_id"),
+    )
+    op.execute(
+        """
+        INSERT INTO empresas_resumo (empresa_id, mensal, trimestral, anual)
+        SELECT
+            empresas.id,
+            COUNT(CASE WHEN obrigacoes_acessorias.periodicidade = 'MENSAL' THEN 1 END),
+            COUNT(CASE WHEN obrigacoes_acessorias.periodicidade = 'TRIMESTRAL' THEN 1 END),
+            COUNT(CASE WHEN obrigacoes_acessorias.periodicidade = 'ANUAL' THEN 1 END)
+        FROM empresas
+        LEFT JOIN obrigacoes_acessorias ON obrigacoes_acessorias.empresa_id = empresas.id
+        GROUP BY empresas.id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("empresas_resumo")
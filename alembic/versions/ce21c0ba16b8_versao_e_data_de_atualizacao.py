@@ -0,0 +1,42 @@
+"""versao e data de atualizacao
+
+Revision ID: ce21c0ba16b8
+Revises: e10d4e12ccf9
+Create Date: 2026-10-18 01:21:42.291542
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "ce21c0ba16b8"
+down_revision: Union[str, None] = "e10d4e12ccf9"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    for table in ("empresas", "obrigacoes_acessorias"):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.add_column(
+                sa.Column("version", sa.Integer(), server_default="1", nullable=False)
+            )
+            batch_op.add_column(
+                sa.Column(
+                    "updated_at",
+                    sa.DateTime(timezone=True),
+                    server_default=sa.func.now(),
+                    nullable=False,
+                )
+            )
+
+
+def downgrade() -> None:
+    for table in ("obrigacoes_acessorias", "empresas"):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column("updated_at")
+            batch_op.drop_column("version")
@@ -0,0 +1,37 @@
+"""indice obrigacoes por empresa e periodicidade
+
+Revision ID: e10d4e12ccf9
+Revises: e3f17768aa6b
+Create Date: 2026-10-18 01:18:08.519552
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e10d4e12ccf9"
+down_revision: Union[str, None] = "e3f17768aa6b"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_obrigacoes_acessorias_empresa_id_periodicidade",
+            "obrigacoes_acessorias",
+            ["empresa_id", "periodicidade"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_obrigacoes_acessorias_empresa_id_periodicidade",
+            table_name="obrigacoes_acessorias",
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,39 @@
+"""eventos de alteracao
+
+Revision ID: e2b4e13bdbca
+Revises: 2a8d7562c596
+Create Date: 2026-10-18 02:00:21.445941
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e2b4e13bdbca"
+down_revision: Union[str, None] = "2a8d7562c596"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "eventos",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("recurso", sa.String(), nullable=False),
+        sa.Column("recurso_id", sa.Integer(), nullable=False),
+        sa.Column("operacao", sa.String(), nullable=False),
+        sa.Column(
+            "criado_em", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_eventos_criado_em"), "eventos", ["criado_em"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_eventos_criado_em"), table_name="eventos")
+    op.drop_table("eventos")
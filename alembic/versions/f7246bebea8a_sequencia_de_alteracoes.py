@@ -0,0 +1,72 @@
+"""sequencia de alteracoes
+
+Revision ID: f7246bebea8a
+Revises: e2b4e13bdbca
+Create Date: 2026-10-18 02:31:07.512940
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "f7246bebea8a"
+down_revision: Union[str, None] = "e2b4e13bdbca"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TABLES = ["empresas", "obrigacoes_acessorias"]
+
+
+def recreate_eventos(autoincrement):
+    # Only SQLite needs this: without AUTOINCREMENT it hands out the ids of
+    # pruned events again.
+    if op.get_bind().dialect.name != "sqlite":
+        return
+
+    with op.batch_alter_table(
+        "eventos", recreate="always", table_kwargs={"sqlite_autoincrement": autoincrement}
+    ):
+        pass
+
+
+def upgrade() -> None:
+    # Existing rows start at 0 and come with the first sync of a client.
+    for table in TABLES:
+        op.add_column(table, sa.Column("seq", sa.Integer(), server_default="0", nullable=False))
+
+    recreate_eventos(True)
+
+    with op.get_context().autocommit_block():
+        for table in TABLES:
+            op.create_index(
+                f"ix_{table}_seq_id", table, ["seq", "id"], postgresql_concurrently=True
+            )
+
+        op.create_index(
+            "ix_eventos_recurso_operacao_id",
+            "eventos",
+            ["recurso", "operacao", "id"],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_eventos_recurso_operacao_id", table_name="eventos", postgresql_concurrently=True
+        )
+
+        for table in TABLES:
+            op.drop_index(f"ix_{table}_seq_id", table_name=table, postgresql_concurrently=True)
+
+    recreate_eventos(False)
+
+    # A plain DROP COLUMN: a batch copy of empresas would lose its search
+    # triggers.
+    for table in TABLES:
+        op.drop_column(table, "seq")
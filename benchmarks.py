@@ -0,0 +1,604 @@
+import asyncio
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from fastapi import Depends, FastAPI
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import create_engine, event, func, select, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+import models
+import schemas
+from cache import empresa_cache
+from cnpj import check_digits
+from compression import ENCODERS
+from database import Base, get_db, sqlite_foreign_keys
+from due_dates import roll_calendar, today
+from serialization import orm_response
+from server import app
+
+BENCHMARKS = {}
+
+
+def benchmark(fn):
+    BENCHMARKS[fn.__name__] = fn
+
+    return fn
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def report(label, latencies):
+    print(
+        f"{label:<40} n={len(latencies):<6} "
+        f"p50={percentile(latencies, 50) * 1000:8.2f}ms "
+        f"p99={percentile(latencies, 99) * 1000:8.2f}ms "
+        f"média={statistics.fmean(latencies) * 1000:8.2f}ms"
+    )
+
+
+def sqlite_sleep(engine):
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "connect")
+    def connect(dbapi_connection, connection_record):
+        dbapi_connection.create_function("sleep", 1, time.sleep)
+
+    return engine
+
+
+class BenchDatabase:
+    def __init__(self, directory):
+        self.path = Path(directory) / "bench.db"
+        self.engine = sqlite_sleep(
+            sqlite_foreign_keys(create_async_engine(f"sqlite+aiosqlite:///{self.path}"))
+        )
+        self.SessionLocal = async_sessionmaker(
+            self.engine, autoflush=False, expire_on_commit=False
+        )
+
+    async def __aenter__(self):
+        async with self.engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+
+        async def override_get_db():
+            db = self.SessionLocal()
+
+            try:
+                yield db
+            finally:
+                await db.close()
+
+        app.dependency_overrides[get_db] = override_get_db
+
+        return self
+
+    async def __aexit__(self, *exc_info):
+        app.dependency_overrides.pop(get_db, None)
+
+        await self.engine.dispose()
+
+    def client(self):
+        return AsyncClient(transport=ASGITransport(app=app), base_url="http://bench")
+
+
+async def timed_requests(client, path, total, concurrency):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.get(path)
+            latencies.append(time.perf_counter() - start)
+
+            response.raise_for_status()
+
+    await asyncio.gather(*(one() for _ in range(total)))
+
+    return latencies
+
+
+def baseline_app(SessionLocal):
+    # GET /obrigacoes/{id} as it was before the async database layer: an async
+    # handler making blocking calls on a sync Session.
+    baseline = FastAPI()
+
+    def get_sync_db():
+        db = SessionLocal()
+
+        try:
+            yield db
+        finally:
+            db.close()
+
+    @baseline.get("/obrigacoes/{obrigacao_id}", response_model=schemas.ObrigacaoAcessoria)
+    async def read_obrigacao(obrigacao_id: int, db: Session = Depends(get_sync_db)):
+        return db.get(models.ObrigacaoAcessoria, obrigacao_id)
+
+    return baseline
+
+
+async def with_slow_query(run_slow_query, pause, measure):
+    done = asyncio.Event()
+    slow_queries = 0
+
+    async def keep_slow_query_running():
+        nonlocal slow_queries
+
+        while not done.is_set():
+            await run_slow_query()
+            slow_queries += 1
+
+            await asyncio.sleep(pause)
+
+    slow_task = asyncio.create_task(keep_slow_query_running())
+
+    await asyncio.sleep(0.05)
+
+    latencies = await measure()
+
+    done.set()
+    await slow_task
+
+    return latencies, slow_queries
+
+
+@benchmark
+async def slow_query_latency(total=2000, concurrency=20, slow=0.2):
+    # The slow query waits rather than computes, like a lock wait or a remote
+    # scan would: the case the async layer is meant to keep off the loop.
+    slow_query = text("SELECT sleep(:seconds)").bindparams(seconds=slow)
+
+    with tempfile.TemporaryDirectory() as directory:
+        async with BenchDatabase(directory) as db:
+            async with db.SessionLocal() as session:
+                session.add(
+                    models.Empresa(
+                        nome="Empresa Bench",
+                        cnpj="11222333000181",
+                        endereco="Rua Bench",
+                        email="bench@email.com",
+                        telefone="11999999999",
+                        obrigacoes=[
+                            models.ObrigacaoAcessoria(
+                                nome="Bench",
+                                periodicidade=models.ObrigacaoAcessoria.Periodicidade.MENSAL,
+                            )
+                        ],
+                    )
+                )
+                await session.commit()
+
+            # Obligations are not cached, so every request reaches the pool
+            # while the slow query holds one of its connections.
+            path = "/obrigacoes/1"
+
+            async def run_async_slow_query():
+                async with db.SessionLocal() as session:
+                    await session.execute(slow_query)
+
+            # One connection per request in flight: the sync handler holds
+            # its connection on the loop until the dependency closes it.
+            sync_engine = sqlite_sleep(
+                create_engine(f"sqlite:///{db.path}", pool_size=concurrency + 1)
+            )
+            sync_session = sessionmaker(sync_engine)()
+
+            async def run_sync_slow_query():
+                sync_session.execute(slow_query)
+
+            for label, client, run_slow_query in (
+                ("async", db.client(), run_async_slow_query),
+                (
+                    "sync",
+                    AsyncClient(
+                        transport=ASGITransport(app=baseline_app(sessionmaker(sync_engine))),
+                        base_url="http://bench",
+                    ),
+                    run_sync_slow_query,
+                ),
+            ):
+                async with client:
+                    await timed_requests(client, path, 50, concurrency)
+
+                    report(
+                        f"{label} sem consulta lenta",
+                        await timed_requests(client, path, total, concurrency),
+                    )
+
+                    latencies, slow_queries = await with_slow_query(
+                        run_slow_query,
+                        slow,
+                        lambda: timed_requests(client, path, total, concurrency),
+                    )
+
+                    report(f"{label} com consulta lenta em andamento", latencies)
+                    print(f"consultas lentas concluídas durante a medição: {slow_queries}")
+
+            sync_session.close()
+            sync_engine.dispose()
+
+
+def empresa_payload(n):
+    base = f"{n:08d}0001"
+
+    return {
+        "nome": f"Empresa {n}",
+        "cnpj": base + check_digits(base),
+        "endereco": f"Rua {n}",
+        "email": f"empresa{n}@email.com",
+        "telefone": "11999999999",
+    }
+
+
+@benchmark
+async def bulk_empresas(total=10000, sample=500):
+    with tempfile.TemporaryDirectory() as directory:
+        async with BenchDatabase(directory) as db:
+            async with db.client() as client:
+                start = time.perf_counter()
+
+                for n in range(sample):
+                    (await client.post("/empresas/", json=empresa_payload(n))).raise_for_status()
+
+                single = (time.perf_counter() - start) / sample
+
+                print(
+                    f"POST /empresas/ individual: {single * 1000:.2f}ms/linha "
+                    f"(~{single * total:.1f}s para {total} linhas)"
+                )
+
+                payload = [empresa_payload(n) for n in range(total)]
+
+                for label in ("inserção", "upsert"):
+                    start = time.perf_counter()
+                    response = await client.post("/empresas/bulk", json=payload, timeout=None)
+                    elapsed = time.perf_counter() - start
+
+                    response.raise_for_status()
+
+                    print(f"POST /empresas/bulk ({label}): {total} linhas em {elapsed:.2f}s")
+
+
+@benchmark
+async def obrigacoes_index(total=1_000_000, empresas=10_000, requests=200):
+    index = "ix_obrigacoes_acessorias_empresa_id_periodicidade"
+    periodicidades = [p.name for p in models.ObrigacaoAcessoria.Periodicidade]
+    query = (
+        "SELECT * FROM obrigacoes_acessorias "
+        "WHERE empresa_id = 4242 AND periodicidade = 'MENSAL' ORDER BY id LIMIT 101"
+    )
+
+    with tempfile.TemporaryDirectory() as directory:
+        async with BenchDatabase(directory) as db:
+            async with db.engine.begin() as connection:
+                await connection.exec_driver_sql(
+                    "INSERT INTO empresas (id, nome, cnpj, endereco, email, telefone) "
+                    "VALUES (?, 'Empresa', printf('%014d', ?), 'Rua', 'e@email.com', '1')",
+                    [(n, n) for n in range(1, empresas + 1)],
+                )
+                await connection.exec_driver_sql(
+                    "INSERT INTO obrigacoes_acessorias (nome, periodicidade, empresa_id) "
+                    "VALUES ('Obrigação', ?, ?)",
+                    [(periodicidades[n % 3], n % empresas + 1) for n in range(total)],
+                )
+
+            async with db.client() as client:
+                for label in ("com índice", "sem índice"):
+                    if label == "sem índice":
+                        async with db.engine.begin() as connection:
+                            await connection.exec_driver_sql(f"DROP INDEX {index}")
+
+                        await db.engine.dispose()
+
+                    async with db.engine.connect() as connection:
+                        plan = (
+                            await connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {query}")
+                        ).all()
+
+                    print(f"{label}: {' | '.join(row[-1] for row in plan)}")
+
+                    report(
+                        f"GET /obrigacoes/ filtrado ({label})",
+                        await timed_requests(
+                            client,
+                            "/obrigacoes/?empresa_id=4242&periodicidade=mensal",
+                            requests,
+                            1,
+                        ),
+                    )
+
+
+@benchmark
+async def serialization(sizes=(1_000, 10_000, 100_000), repeat=3):
+    route = next(
+        route
+        for route in app.routes
+        if getattr(route, "path", None) == "/empresas/" and "GET" in route.methods
+    )
+
+    with tempfile.TemporaryDirectory() as directory:
+        async with BenchDatabase(directory) as db:
+            async with db.engine.begin() as connection:
+                await connection.exec_driver_sql(
+                    "INSERT INTO empresas (id, nome, cnpj, endereco, email, telefone) "
+                    "VALUES (?, 'Empresa', printf('%014d', ?), 'Rua', 'e@email.com', '1')",
+                    [(n, n) for n in range(1, max(sizes) + 1)],
+                )
+
+            for size in sizes:
+                async with db.SessionLocal() as session:
+                    rows = (
+                        await session.scalars(
+                            select(models.Empresa).order_by(models.Empresa.id).limit(size)
+                        )
+                    ).all()
+
+                async def fastapi_json():
+                    content = await serialize_response(
+                        field=route.response_field, response_content=rows
+                    )
+
+                    return JSONResponse(content).body
+
+                async def fastapi_orjson():
+                    content = await serialize_response(
+                        field=route.response_field, response_content=rows
+                    )
+
+                    return ORJSONResponse(content).body
+
+                async def fast_path():
+                    return orm_response(list[schemas.Empresa], rows).body
+
+                for label, render in (
+                    ("response_model + JSONResponse", fastapi_json),
+                    ("response_model + ORJSONResponse", fastapi_orjson),
+                    ("orm_response", fast_path),
+                ):
+                    elapsed = []
+
+                    for _ in range(repeat):
+                        start = time.perf_counter()
+                        await render()
+                        elapsed.append(time.perf_counter() - start)
+
+                    best = min(elapsed)
+
+                    print(
+                        f"{size:>7} linhas {label:<32} {best * 1000:9.2f}ms "
+                        f"{size / best:12.0f} linhas/s"
+                    )
+
+
+@benchmark
+async def compression(sizes=(10, 100, 1000), export_total=10_000, requests=50):
+    encodings = ["identity", "gzip"] + (["br"] if "br" in ENCODERS else [])
+
+    with tempfile.TemporaryDirectory() as directory:
+        async with BenchDatabase(directory) as db:
+            async with db.engine.begin() as connection:
+                await connection.exec_driver_sql(
+                    "INSERT INTO empresas (id, nome, cnpj, endereco, email, telefone) "
+                    "VALUES (?, 'Empresa ' || ?, printf('%014d', ?), 'Rua ' || ?, "
+                    "'empresa' || ? || '@email.com', '11999999999')",
+                    [(n, n, n, n, n) for n in range(1, export_total + 1)],
+                )
+
+            paths = [f"/empresas/?limit={size}" for size in sizes]
+            paths.append("/empresas/export?format=ndjson")
+
+            async with db.client() as client:
+                for path in paths:
+                    for encoding in encodings:
+                        sizes_on_wire = []
+                        start = time.process_time()
+
+                        for _ in range(requests):
+                            async with client.stream(
+                                "GET", path, headers={"Accept-Encoding": encoding}
+                            ) as response:
+                                sizes_on_wire.append(
+                                    sum([len(chunk) async for chunk in response.aiter_raw()])
+                                )
+
+                        cpu = (time.process_time() - start) / requests
+
+                        print(
+                            f"{path:<32} {encoding:<9} {statistics.fmean(sizes_on_wire):>12.0f} "
+                            f"bytes  CPU {cpu * 1000:8.2f}ms/requisição"
+                        )
+
+
+@benchmark
+async def due_dates(total=100_000, empresas=1_000, days=90, requests=50):
+    periodicidades = [p.name for p in models.ObrigacaoAcessoria.Periodicidade]
+    de = today()
+    ate = de + timedelta(days=days)
+
+    with tempfile.TemporaryDirectory() as directory:
+        async with BenchDatabase(directory) as db:
+            async with db.engine.begin() as connection:
+                await connection.exec_driver_sql(
+                    "INSERT INTO empresas (id, nome, cnpj, endereco, email, telefone) "
+                    "VALUES (?, 'Empresa', printf('%014d', ?), 'Rua', 'e@email.com', '1')",
+                    [(n, n) for n in range(1, empresas + 1)],
+                )
+                await connection.exec_driver_sql(
+                    "INSERT INTO obrigacoes_acessorias "
+                    "(nome, periodicidade, empresa_id, data_vencimento) "
+                    "VALUES ('Obrigação', ?, ?, ?)",
+                    [
+                        (
+                            periodicidades[n % 3],
+                            n % empresas + 1,
+                            (de - timedelta(days=n % 365)).isoformat(),
+                        )
+                        for n in range(total)
+                    ],
+                )
+
+            async with db.SessionLocal() as session:
+                start = time.perf_counter()
+                await roll_calendar(session)
+                elapsed = time.perf_counter() - start
+
+                rows = await session.scalar(select(func.count(models.CalendarioVencimento.data)))
+
+            print(f"calendário materializado: {rows} vencimentos em {elapsed:.2f}s")
+
+            path = f"/obrigacoes/vencimentos?de={de}&ate={ate}&limit=1000"
+
+            async with db.client() as client:
+                report(
+                    f"GET vencimentos {days} dias (1ª página)",
+                    await timed_requests(client, path, requests, 1),
+                )
+
+                start = time.perf_counter()
+                cursor = None
+                found = 0
+
+                while True:
+                    response = await client.get(path + (f"&cursor={cursor}" if cursor else ""))
+                    found += len(response.json())
+                    cursor = response.headers.get("x-next-cursor")
+
+                    if cursor is None:
+                        break
+
+                print(
+                    f"janela de {days} dias completa: {found} vencimentos "
+                    f"em {time.perf_counter() - start:.2f}s"
+                )
+
+            async with db.SessionLocal() as session:
+                start = time.perf_counter()
+                counted = await session.scalar(
+                    select(func.count(models.CalendarioVencimento.data)).where(
+                        models.CalendarioVencimento.data.between(de, ate)
+                    )
+                )
+
+                print(
+                    f"contagem na janela pelo calendário: {counted} em "
+                    f"{(time.perf_counter() - start) * 1000:.1f}ms"
+                )
+
+
+@benchmark
+async def batch_by_ids(empresas=100_000, sizes=(200, 500), repeat=5):
+    periodicidades = [p.name for p in models.ObrigacaoAcessoria.Periodicidade]
+    ids = random.Random(42).sample(range(1, empresas + 1), max(sizes))
+
+    with tempfile.TemporaryDirectory() as directory:
+        async with BenchDatabase(directory) as db:
+            async with db.engine.begin() as connection:
+                await connection.exec_driver_sql(
+                    "INSERT INTO empresas (id, nome, cnpj, endereco, email, telefone) "
+                    "VALUES (?, 'Empresa', printf('%014d', ?), 'Rua', 'e@email.com', '1')",
+                    [(n, n) for n in range(1, empresas + 1)],
+                )
+                await connection.exec_driver_sql(
+                    "INSERT INTO obrigacoes_acessorias (id, nome, periodicidade, empresa_id) "
+                    "VALUES (?, 'Obrigação', ?, ?)",
+                    [(n, periodicidades[n % 3], n) for n in range(1, empresas + 1)],
+                )
+
+            async def one_by_one(client, recurso, batch):
+                await empresa_cache.clear()
+
+                for obj_id in batch:
+                    (await client.get(f"/{recurso}/{obj_id}")).raise_for_status()
+
+            async def get_batch(client, recurso, batch):
+                params = [("ids", obj_id) for obj_id in batch]
+
+                (await client.get(f"/{recurso}/batch", params=params)).raise_for_status()
+
+            async def post_batch(client, recurso, batch):
+                (await client.post(f"/{recurso}/batch", json=batch)).raise_for_status()
+
+            async with db.client() as client:
+                for recurso in ("empresas", "obrigacoes"):
+                    for size in sizes:
+                        batch = ids[:size]
+
+                        for label, fn in (
+                            ("um GET por id", one_by_one),
+                            ("GET batch", get_batch),
+                            ("POST batch", post_batch),
+                        ):
+                            latencies = []
+
+                            for _ in range(repeat):
+                                start = time.perf_counter()
+                                await fn(client, recurso, batch)
+                                latencies.append(time.perf_counter() - start)
+
+                            report(f"{recurso} {size} ids: {label}", latencies)
+
+
+@benchmark
+async def search(total=1_000_000, requests=100):
+    prefixes = ["Padaria", "Mercado", "Farmácia", "Oficina", "Contabilidade", "Auto Peças"]
+    names = ["São João", "Central", "Aurora", "Boa Vista", "Horizonte", "Primavera", "Estrela"]
+    neighborhoods = [f"Bairro {n}" for n in range(500)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        async with BenchDatabase(directory) as db:
+            start = time.perf_counter()
+
+            async with db.engine.begin() as connection:
+                await connection.exec_driver_sql(
+                    "INSERT INTO empresas (id, nome, cnpj, endereco, email, telefone) "
+                    "VALUES (?, ?, printf('%014d', ?), 'Rua', ?, '1')",
+                    [
+                        (
+                            n,
+                            f"{prefixes[n % 6]} {names[n % 7]} {neighborhoods[n % 500]} {n}",
+                            n * 7919,
+                            f"contato{n}@empresa{n % 1000}.com",
+                        )
+                        for n in range(1, total + 1)
+                    ],
+                )
+
+            print(f"{total} empresas indexadas em {time.perf_counter() - start:.1f}s")
+
+            async with db.client() as client:
+                for label, q in (
+                    ("nome (prefixo)", "padaria auro"),
+                    ("nome (termos raros)", "bairro 123 estrela"),
+                    ("email", "empresa42"),
+                    ("CNPJ (prefixo)", "00000079"),
+                    ("CNPJ formatado", "00.000.079/0"),
+                ):
+                    report(
+                        f"GET /empresas/search {label}",
+                        await timed_requests(client, f"/empresas/search?q={q}", requests, 1),
+                    )
+
+
+def main(names):
+    for name in names or BENCHMARKS:
+        print(f"== {name}")
+
+        asyncio.run(BENCHMARKS[name]())
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
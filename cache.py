@@ -0,0 +1,188 @@
+import json
+import time
+from collections import OrderedDict
+
+from decouple import config
+
+import models
+import schemas
+from metrics import Counter
+
+CACHE_BACKEND = config("CACHE_BACKEND", default="memory")
+CACHE_TTL = config("CACHE_TTL", default=60, cast=float)
+CACHE_MAXSIZE = config("CACHE_MAXSIZE", default=10000, cast=int)
+CACHE_TOMBSTONE_TTL = config("CACHE_TOMBSTONE_TTL", default=5, cast=float)
+REDIS_URL = config("REDIS_URL", default="redis://localhost:6379/0")
+
+
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def as_dict(self):
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+class MemoryCache:
+    def __init__(self, maxsize=CACHE_MAXSIZE, ttl=CACHE_TTL, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.stats = CacheStats()
+        self._entries = OrderedDict()
+
+    async def get(self, key):
+        entry = self._entries.get(key)
+
+        if entry is None:
+            self.stats.misses += 1
+            return None
+
+        expires_at, value = entry
+
+        if expires_at <= self.clock():
+            del self._entries[key]
+            self.stats.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+
+        return value
+
+    async def set(self, key, value, ttl=None):
+        self._entries[key] = (self.clock() + (ttl or self.ttl), value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    async def add(self, key, value):
+        entry = self._entries.get(key)
+
+        if entry is not None and entry[0] > self.clock():
+            return
+
+        await self.set(key, value)
+
+    async def delete(self, *keys):
+        for key in keys:
+            self._entries.pop(key, None)
+
+    async def clear(self):
+        self._entries.clear()
+
+
+class RedisCache:
+    def __init__(self, client, ttl=CACHE_TTL, prefix="dbide:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self.stats = CacheStats()
+
+    async def get(self, key):
+        raw = await self.client.get(self.prefix + key)
+
+        if raw is None:
+            self.stats.misses += 1
+            return None
+
+        self.stats.hits += 1
+
+        return json.loads(raw)
+
+    async def set(self, key, value, ttl=None):
+        await self.client.set(
+            self.prefix + key, json.dumps(value), px=int((ttl or self.ttl) * 1000)
+        )
+
+    async def add(self, key, value):
+        await self.client.set(
+            self.prefix + key, json.dumps(value), px=int(self.ttl * 1000), nx=True
+        )
+
+    async def delete(self, *keys):
+        if keys:
+            await self.client.delete(*(self.prefix + key for key in keys))
+
+    async def clear(self):
+        keys = [key async for key in self.client.scan_iter(match=self.prefix + "*")]
+
+        if keys:
+            await self.client.delete(*keys)
+
+
+def make_backend():
+    if CACHE_BACKEND == "redis":
+        import redis.asyncio as redis
+
+        return RedisCache(redis.from_url(REDIS_URL))
+
+    return MemoryCache()
+
+
+# Left by invalidate in place of the entry, see EmpresaCache.get.
+TOMBSTONE = "invalidated"
+
+
+class EmpresaCache:
+    def __init__(self, backend):
+        self.backend = backend
+
+    @property
+    def stats(self):
+        return self.backend.stats
+
+    def _store(self, orm_empresa):
+        return schemas.Empresa.model_validate(orm_empresa, from_attributes=True).model_dump(
+            mode="json"
+        )
+
+    async def get(self, db, empresa_id):
+        cached = await self.backend.get(f"empresa:{empresa_id}")
+
+        if cached is not None and cached != TOMBSTONE:
+            return cached
+
+        orm_empresa = await db.get(models.Empresa, empresa_id)
+
+        if orm_empresa is None:
+            return None
+
+        empresa = self._store(orm_empresa)
+
+        # Only stored if nothing is there: a write that commits and
+        # invalidates while the row is being read leaves a tombstone, so the
+        # old row is never put back.
+        if cached is None:
+            await self.backend.add(f"empresa:{empresa_id}", empresa)
+
+        return empresa
+
+    async def invalidate(self, empresa_id):
+        await self.backend.set(f"empresa:{empresa_id}", TOMBSTONE, ttl=CACHE_TOMBSTONE_TTL)
+
+    async def clear(self):
+        await self.backend.clear()
+
+
+empresa_cache = EmpresaCache(make_backend())
+
+CACHE_HITS = Counter(
+    "dbide_cache_hits_total",
+    "Leituras de empresas atendidas pelo cache",
+    function=lambda: empresa_cache.stats.hits,
+)
+CACHE_MISSES = Counter(
+    "dbide_cache_misses_total",
+    "Leituras de empresas que foram ao banco",
+    function=lambda: empresa_cache.stats.misses,
+)
+CACHE_EVICTIONS = Counter(
+    "dbide_cache_evictions_total",
+    "Entradas removidas do cache por falta de espaço",
+    function=lambda: empresa_cache.stats.evictions,
+)
@@ -0,0 +1,31 @@
+import re
+
+WEIGHTS = (
+    (5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2),
+    (6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2),
+)
+
+# Same characters stripped from stored CNPJs by migration 416acf6db7aa.
+PUNCTUATION = re.compile(r"[./\- ]")
+
+
+def check_digits(base):
+    digits = [int(digit) for digit in base]
+
+    for weights in WEIGHTS:
+        remainder = sum(digit * weight for digit, weight in zip(digits, weights)) % 11
+        digits.append(0 if remainder < 2 else 11 - remainder)
+
+    return "".join(map(str, digits[12:]))
+
+
+def normalize_cnpj(value):
+    cnpj = PUNCTUATION.sub("", value)
+
+    if not re.fullmatch(r"\d{14}", cnpj):
+        raise ValueError("CNPJ deve ter 14 dígitos")
+
+    if len(set(cnpj)) == 1 or cnpj[12:] != check_digits(cnpj[:12]):
+        raise ValueError("CNPJ com dígitos verificadores inválidos")
+
+    return cnpj
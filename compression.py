@@ -0,0 +1,157 @@
+import zlib
+
+from decouple import config
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSION_MINIMUM_SIZE = config("COMPRESSION_MINIMUM_SIZE", default=500, cast=int)
+COMPRESSION_LEVEL = config("COMPRESSION_LEVEL", default=6, cast=int)
+COMPRESSION_BROTLI_QUALITY = config("COMPRESSION_BROTLI_QUALITY", default=4, cast=int)
+
+# Event streams must reach the client as soon as they are written.
+UNCOMPRESSED_TYPES = ("text/event-stream",)
+
+
+class GzipEncoder:
+    def __init__(self, level=COMPRESSION_LEVEL):
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data):
+        return self.compressor.compress(data)
+
+    def finish(self):
+        return self.compressor.flush()
+
+
+class BrotliEncoder:
+    def __init__(self, quality=COMPRESSION_BROTLI_QUALITY):
+        self.compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self.compressor.process(data)
+
+    def finish(self):
+        return self.compressor.finish()
+
+
+ENCODERS = {"gzip": GzipEncoder}
+
+if brotli is not None:
+    ENCODERS = {"br": BrotliEncoder, **ENCODERS}
+
+
+def negotiate(accept_encoding):
+    accepted = {}
+
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().lower().partition(";")
+        quality = 1.0
+
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+
+        accepted[coding.strip()] = quality
+
+    candidates = [coding for coding in ENCODERS if accepted.get(coding, accepted.get("*", 0)) > 0]
+
+    return max(candidates, key=lambda coding: accepted.get(coding, 0), default=None)
+
+
+class CompressionResponder:
+    def __init__(self, app, encoding, minimum_size):
+        self.app = app
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.encoder = None
+        self.start_message = None
+        self.passthrough = False
+
+    async def __call__(self, scope, receive, send):
+        self.send = send
+
+        await self.app(scope, receive, self.send_compressed)
+
+    async def send_compressed(self, message):
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            self.start_message = message
+            self.passthrough = "content-encoding" in headers or headers.get(
+                "content-type", ""
+            ).startswith(UNCOMPRESSED_TYPES)
+
+            if self.passthrough:
+                await self.send(message)
+
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.encoder is None:
+            if len(body) < self.minimum_size and not more_body:
+                self.passthrough = True
+
+                await self.send(self.start_message)
+                await self.send(message)
+                return
+
+            self.encoder = ENCODERS[self.encoding]()
+            compressed = self.encoder.compress(body)
+
+            if not more_body:
+                compressed += self.encoder.finish()
+
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+
+            # The compressed body is a different representation, so a strong
+            # validator must not be reused for it.
+            if "etag" in headers and not headers["etag"].startswith("W/"):
+                headers["ETag"] = "W/" + headers["etag"]
+
+            if more_body:
+                del headers["Content-Length"]
+            else:
+                headers["Content-Length"] = str(len(compressed))
+
+            await self.send(self.start_message)
+            await self.send({**message, "body": compressed})
+            return
+
+        compressed = self.encoder.compress(body)
+
+        if not more_body:
+            compressed += self.encoder.finish()
+
+        await self.send({**message, "body": compressed})
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size=COMPRESSION_MINIMUM_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        await CompressionResponder(self.app, encoding, self.minimum_size)(scope, receive, send)
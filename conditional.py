@@ -0,0 +1,95 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Response
+
+
+def _field(row, key):
+    value = row[key] if isinstance(row, dict) else getattr(row, key)
+
+    if key == "updated_at" and isinstance(value, str):
+        value = datetime.fromisoformat(value)
+
+    if isinstance(value, datetime) and value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+
+    return value
+
+
+def resource_etag(row):
+    return f'"{_field(row, "id")}-{_field(row, "version")}"'
+
+
+def collection_etag(rows):
+    digest = hashlib.blake2b(digest_size=16)
+
+    for row in rows:
+        digest.update(f"{_field(row, 'id')}:{_field(row, 'version')};".encode())
+
+    return f'W/"{digest.hexdigest()}"'
+
+
+def last_modified(rows):
+    return max((_field(row, "updated_at") for row in rows), default=None)
+
+
+def if_match_versions(request, resource_id):
+    header = request.headers.get("if-match")
+
+    if header is None or header.strip() == "*":
+        return None
+
+    versions = []
+
+    for tag in header.split(","):
+        tag_id, _, version = tag.strip().removeprefix("W/").strip('"').rpartition("-")
+
+        if tag_id == str(resource_id) and version.isdigit():
+            versions.append(int(version))
+
+    return versions
+
+
+def _etag_matches(header, etag):
+    if header.strip() == "*":
+        return True
+
+    opaque = etag.removeprefix("W/")
+
+    return any(tag.strip().removeprefix("W/") == opaque for tag in header.split(","))
+
+
+def _not_modified_since(header, modified):
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+
+    return modified.replace(microsecond=0) <= since
+
+
+def conditional_response(request, response, etag, modified=None):
+    headers = {"ETag": etag}
+
+    if modified is not None:
+        headers["Last-Modified"] = format_datetime(modified.astimezone(timezone.utc), usegmt=True)
+
+    response.headers.update(headers)
+
+    if_none_match = request.headers.get("if-none-match")
+
+    if if_none_match is not None:
+        not_modified = _etag_matches(if_none_match, etag)
+    elif modified is not None and "if-modified-since" in request.headers:
+        not_modified = _not_modified_since(request.headers["if-modified-since"], modified)
+    else:
+        not_modified = False
+
+    if not_modified:
+        return Response(status_code=304, headers=headers)
+
+    return None
@@ -1,20 +1,171 @@
+import time
+
 from decouple import config
-from sqlalchemy import create_engine
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
+
+from metrics import Counter, Gauge, Histogram, current_request
+
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
 
 DATABASE_URL = config("DATABASE_URL")
+DATABASE_POOL_SIZE = config("DATABASE_POOL_SIZE", default=5, cast=int)
+DATABASE_MAX_OVERFLOW = config("DATABASE_MAX_OVERFLOW", default=10, cast=int)
+DATABASE_POOL_TIMEOUT = config("DATABASE_POOL_TIMEOUT", default=30, cast=float)
+DATABASE_POOL_RECYCLE = config("DATABASE_POOL_RECYCLE", default=-1, cast=int)
+DATABASE_POOL_PRE_PING = config("DATABASE_POOL_PRE_PING", default=False, cast=bool)
+DATABASE_EXTERNAL_POOLER = config("DATABASE_EXTERNAL_POOLER", default=False, cast=bool)
+
+POOL_CHECKED_OUT = Gauge(
+    "dbide_db_pool_checked_out", "Conexões emprestadas pelo pool", labelnames=["pool"]
+)
+POOL_OVERFLOW = Gauge(
+    "dbide_db_pool_overflow", "Conexões abertas além de pool_size", labelnames=["pool"]
+)
+POOL_CONNECTIONS = Counter(
+    "dbide_db_pool_connections_total", "Conexões abertas pelo pool", labelnames=["pool"]
+)
+POOL_WAIT_SECONDS = Histogram(
+    "dbide_db_pool_wait_seconds", "Tempo de espera por uma conexão do pool", labelnames=["pool"]
+)
+QUERIES = Counter("dbide_db_queries_total", "Consultas SQL executadas", labelnames=["statement"])
+QUERY_SECONDS = Histogram(
+    "dbide_db_query_duration_seconds", "Latência das consultas SQL", labelnames=["statement"]
+)
+
+
+def async_url(url):
+    url = make_url(url)
+
+    return url.set(drivername=ASYNC_DRIVERS.get(url.drivername, url.drivername))
+
+
+def dialect_insert(db, model):
+    if db.bind.dialect.name == "postgresql":
+        return postgresql.insert(model)
+
+    return sqlite.insert(model)
+
+
+async def scalars_in(db, stmt, column, values, chunk_size):
+    rows = []
+
+    for start in range(0, len(values), chunk_size):
+        rows += await db.scalars(stmt.where(column.in_(values[start : start + chunk_size])))
+
+    return rows
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    def _do_get(self):
+        start = time.perf_counter()
+
+        try:
+            return super()._do_get()
+        finally:
+            POOL_WAIT_SECONDS.observe(time.perf_counter() - start, pool=self.logging_name)
+
+
+def engine_options(url, name="primary"):
+    options = {"pool_pre_ping": DATABASE_POOL_PRE_PING, "pool_logging_name": name}
+
+    if DATABASE_EXTERNAL_POOLER:
+        options["poolclass"] = NullPool
+    elif make_url(url).get_backend_name() != "sqlite":
+        options.update(
+            poolclass=InstrumentedQueuePool,
+            pool_size=DATABASE_POOL_SIZE,
+            max_overflow=DATABASE_MAX_OVERFLOW,
+            pool_timeout=DATABASE_POOL_TIMEOUT,
+            pool_recycle=DATABASE_POOL_RECYCLE,
+        )
+
+    return options
+
+
+def instrument_pool(engine, name="primary"):
+    def update_overflow():
+        if hasattr(engine.sync_engine.pool, "overflow"):
+            POOL_OVERFLOW.set(max(engine.sync_engine.pool.overflow(), 0), pool=name)
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def connect(dbapi_connection, connection_record):
+        POOL_CONNECTIONS.inc(pool=name)
+
+    @event.listens_for(engine.sync_engine, "checkout")
+    def checkout(dbapi_connection, connection_record, connection_proxy):
+        POOL_CHECKED_OUT.inc(pool=name)
+        update_overflow()
+
+    @event.listens_for(engine.sync_engine, "checkin")
+    def checkin(dbapi_connection, connection_record):
+        POOL_CHECKED_OUT.dec(pool=name)
+        update_overflow()
+
+    return engine
+
+
+def sqlite_foreign_keys(engine):
+    # SQLite ignores foreign keys, and so ON DELETE CASCADE, unless enabled
+    # on every connection.
+    if engine.dialect.name == "sqlite":
+
+        @event.listens_for(engine.sync_engine, "connect")
+        def connect(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA foreign_keys=ON")
+            cursor.close()
+
+    return engine
+
+
+def instrument_queries(engine):
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        kind = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+
+        QUERIES.inc(statement=kind)
+        QUERY_SECONDS.observe(elapsed, statement=kind)
+
+        stats = current_request.get()
+
+        if stats is not None:
+            stats.queries += 1
+            stats.query_seconds += elapsed
+
+    return engine
+
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(engine, autoflush=False, expire_on_commit=False)
+engine = instrument_queries(
+    instrument_pool(
+        sqlite_foreign_keys(
+            create_async_engine(async_url(DATABASE_URL), **engine_options(DATABASE_URL))
+        )
+    )
+)
+SessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
 
 Base = declarative_base()
 
 
-def get_db():
+async def get_db():
     db = SessionLocal()
 
     try:
         yield db
     finally:
-        db.close()
+        await db.close()
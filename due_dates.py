@@ -0,0 +1,144 @@
+import calendar
+from datetime import date, timedelta
+
+from decouple import config
+from sqlalchemy import Integer, and_, case, cast, delete, extract, func, select
+
+import models
+from database import dialect_insert
+
+CALENDAR_HORIZON_DAYS = config("CALENDAR_HORIZON_DAYS", default=400, cast=int)
+CALENDAR_RETENTION_DAYS = config("CALENDAR_RETENTION_DAYS", default=365, cast=int)
+CALENDAR_BATCH_SIZE = config("CALENDAR_BATCH_SIZE", default=10000, cast=int)
+
+STEPS = {
+    models.ObrigacaoAcessoria.Periodicidade.MENSAL: 1,
+    models.ObrigacaoAcessoria.Periodicidade.TRIMESTRAL: 3,
+    models.ObrigacaoAcessoria.Periodicidade.ANUAL: 12,
+}
+
+
+def today():
+    return models.utcnow().date()
+
+
+def window():
+    return (
+        today() - timedelta(days=CALENDAR_RETENTION_DAYS),
+        today() + timedelta(days=CALENDAR_HORIZON_DAYS),
+    )
+
+
+def within_horizon(day):
+    return day <= today() + timedelta(days=CALENDAR_HORIZON_DAYS)
+
+
+def month_index(day):
+    return day.year * 12 + day.month - 1
+
+
+def month_days(month):
+    year, index = divmod(month, 12)
+    last = calendar.monthrange(year, index + 1)[1]
+
+    # Days 29-31 also exist in shorter months and fall on the last day, so a
+    # due date on the 31st is due on Feb 28/29.
+    return [
+        {"mes": month, "dia": day, "data": date(year, index + 1, min(day, last))}
+        for day in range(1, 32)
+    ]
+
+
+async def fill_days(db, start, end):
+    first, last = (
+        await db.execute(
+            select(func.min(models.DiaCalendario.mes), func.max(models.DiaCalendario.mes))
+        )
+    ).one()
+    months = range(month_index(start), month_index(end) + 1)
+
+    if first is not None and first <= months.start and last >= months.stop - 1:
+        return
+
+    rows = [row for month in months for row in month_days(month)]
+
+    await db.execute(
+        dialect_insert(db, models.DiaCalendario).on_conflict_do_nothing(),
+        rows,
+    )
+
+
+def expand(start, end):
+    obrigacao = models.ObrigacaoAcessoria
+    days = models.DiaCalendario
+    anchor = (
+        cast(extract("year", obrigacao.data_vencimento), Integer) * 12
+        + cast(extract("month", obrigacao.data_vencimento), Integer)
+        - 1
+    )
+    step = case(
+        *(
+            (obrigacao.periodicidade == periodicidade, months)
+            for periodicidade, months in STEPS.items()
+        )
+    )
+
+    return (
+        select(obrigacao.id, days.data)
+        .join(
+            days,
+            and_(
+                days.dia == cast(extract("day", obrigacao.data_vencimento), Integer),
+                days.mes >= anchor,
+                (days.mes - anchor) % step == 0,
+            ),
+        )
+        .where(
+            obrigacao.data_vencimento.is_not(None),
+            days.mes.between(month_index(start), month_index(end)),
+            days.data.between(start, end),
+        )
+    )
+
+
+async def materialize(db, start, end, *criteria):
+    await fill_days(db, start, end)
+    await db.execute(
+        dialect_insert(db, models.CalendarioVencimento)
+        .from_select(["obrigacao_id", "data"], expand(start, end).where(*criteria))
+        .on_conflict_do_nothing()
+    )
+
+
+async def update_due_dates(db, obrigacao_ids):
+    await db.execute(
+        delete(models.CalendarioVencimento).where(
+            models.CalendarioVencimento.obrigacao_id.in_(obrigacao_ids)
+        )
+    )
+    await materialize(db, *window(), models.ObrigacaoAcessoria.id.in_(obrigacao_ids))
+
+
+async def roll_calendar(db, batch_size=CALENDAR_BATCH_SIZE):
+    start, end = window()
+
+    await db.execute(
+        delete(models.CalendarioVencimento).where(models.CalendarioVencimento.data < start)
+    )
+    await db.execute(
+        delete(models.DiaCalendario).where(models.DiaCalendario.mes < month_index(start))
+    )
+
+    last_id = await db.scalar(select(func.max(models.ObrigacaoAcessoria.id))) or 0
+
+    for offset in range(0, last_id, batch_size):
+        await materialize(
+            db,
+            start,
+            end,
+            models.ObrigacaoAcessoria.id > offset,
+            models.ObrigacaoAcessoria.id <= offset + batch_size,
+        )
+        await db.commit()
+
+    await db.commit()
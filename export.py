@@ -0,0 +1,55 @@
+import csv
+import io
+from typing import Literal
+
+from decouple import config
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+EXPORT_BATCH_SIZE = config("EXPORT_BATCH_SIZE", default=1000, cast=int)
+
+ExportFormat = Literal["ndjson", "csv"]
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+
+def ndjson_chunk(schema, rows):
+    return b"".join(
+        schema.model_validate(row._mapping).model_dump_json().encode() + b"\n" for row in rows
+    )
+
+
+def csv_chunk(schema, rows, header=False):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(schema.model_fields))
+
+    if header:
+        writer.writeheader()
+
+    writer.writerows(schema.model_validate(row._mapping).model_dump(mode="json") for row in rows)
+
+    return buffer.getvalue().encode()
+
+
+async def stream_rows(bind, stmt, schema, format):
+    # The request session is closed before the body is sent, so the export
+    # owns a session (and its server-side cursor) for the whole stream.
+    async with AsyncSession(bind) as db:
+        result = await db.stream(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+
+        if format == "csv":
+            yield csv_chunk(schema, [], header=True)
+
+        async for rows in result.partitions():
+            if format == "csv":
+                yield csv_chunk(schema, rows)
+            else:
+                yield ndjson_chunk(schema, rows)
+
+
+def export_response(bind, stmt, schema, format, filename):
+    return StreamingResponse(
+        stream_rows(bind, stmt, schema, format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{format}"'},
+    )
@@ -1,3 +1,4 @@
+import asyncio
 import subprocess
 
 import typer
@@ -56,6 +57,50 @@ def test():
         raise typer.Exit(code=1)
 
 
+@app.command()
+def benchmark(names: list[str] = typer.Argument(None)):
+    try:
+        typer.echo("Executando os benchmarks...")
+
+        subprocess.run(["python", "benchmarks.py", *(names or [])], check=True)
+    except subprocess.CalledProcessError as e:
+        typer.echo(f"Erro ao executar os benchmarks: {e}", err=True)
+
+        raise typer.Exit(code=1)
+
+
+@app.command()
+def calendar():
+    from database import SessionLocal
+    from due_dates import roll_calendar
+
+    async def roll():
+        async with SessionLocal() as db:
+            await roll_calendar(db)
+
+    typer.echo("Atualizando o calendário de vencimentos...")
+
+    asyncio.run(roll())
+
+    typer.echo("Calendário de vencimentos atualizado.")
+
+
+@app.command()
+def outbox(days: int = typer.Option(None)):
+    from database import SessionLocal
+    from outbox import OUTBOX_RETENTION_DAYS, prune_eventos
+
+    async def prune():
+        async with SessionLocal() as db:
+            await prune_eventos(db, days or OUTBOX_RETENTION_DAYS)
+
+    typer.echo("Removendo eventos antigos do outbox...")
+
+    asyncio.run(prune())
+
+    typer.echo("Eventos antigos removidos.")
+
+
 @app.command()
 def lint():
     try:
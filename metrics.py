@@ -0,0 +1,251 @@
+import contextvars
+import math
+import threading
+import time
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+
+    return repr(float(value))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+
+    pairs = ",".join(
+        f'{key}="{_format_value(value) if key == "le" else _escape(value)}"'
+        for key, value in labels
+    )
+
+    return "{" + pairs + "}"
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f"Métrica já registrada: {metric.name}")
+
+        self.metrics[metric.name] = metric
+
+        return metric
+
+    def unregister(self, name):
+        self.metrics.pop(name, None)
+
+    def render(self):
+        lines = []
+
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class Metric:
+    type = "untyped"
+
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY, function=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.function = function
+        self._lock = threading.Lock()
+        self._values = {}
+
+        if registry is not None:
+            registry.register(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Labels inválidos para {self.name}: {sorted(labels)}")
+
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key):
+        return tuple(zip(self.labelnames, key))
+
+    def value(self, **labels):
+        if self.function is not None:
+            return self.function()
+
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        if self.function is not None:
+            return [(self.name, (), self.function())]
+
+        with self._lock:
+            items = list(self._values.items())
+
+        return [(self.name, self._labels(key), value) for key, value in items]
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self, name, documentation, labelnames=(), registry=REGISTRY, buckets=DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames, registry)
+
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+
+            self._values[key] = (counts, total + value)
+
+    def count(self, **labels):
+        counts, _ = self._values.get(self._key(labels), ([0], 0.0))
+
+        return sum(counts)
+
+    def sum(self, **labels):
+        _, total = self._values.get(self._key(labels), ([0], 0.0))
+
+        return total
+
+    def samples(self):
+        with self._lock:
+            items = [(key, (list(counts), total)) for key, (counts, total) in self._values.items()]
+
+        samples = []
+
+        for key, (counts, total) in items:
+            labels = self._labels(key)
+            cumulative = 0
+
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                samples.append((f"{self.name}_bucket", labels + (("le", bound),), cumulative))
+
+            samples.append((f"{self.name}_sum", labels, total))
+            samples.append((f"{self.name}_count", labels, cumulative))
+
+        return samples
+
+
+REQUESTS = Counter(
+    "dbide_http_requests_total",
+    "Requisições HTTP atendidas",
+    labelnames=["method", "route", "status"],
+)
+REQUEST_SECONDS = Histogram(
+    "dbide_http_request_duration_seconds",
+    "Latência das requisições HTTP",
+    labelnames=["method", "route", "status"],
+)
+REQUEST_QUERIES = Histogram(
+    "dbide_http_request_queries",
+    "Consultas SQL executadas por requisição",
+    labelnames=["method", "route"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+REQUEST_QUERY_SECONDS = Histogram(
+    "dbide_http_request_query_seconds",
+    "Tempo gasto em SQL por requisição",
+    labelnames=["method", "route"],
+)
+
+
+class RequestStats:
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+
+
+current_request = contextvars.ContextVar("current_request", default=None)
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            route = scope.get("route")
+            labels = {
+                "method": scope["method"],
+                "route": route.path if route is not None else "<unmatched>",
+            }
+
+            REQUESTS.inc(**labels, status=status)
+            REQUEST_SECONDS.observe(elapsed, **labels, status=status)
+            REQUEST_QUERIES.observe(stats.queries, **labels)
+            REQUEST_QUERY_SECONDS.observe(stats.query_seconds, **labels)
+
+            current_request.reset(token)
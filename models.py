@@ -1,15 +1,46 @@
+from datetime import datetime, timezone
 from enum import Enum
 
-from sqlalchemy import Column, ForeignKey, Integer, String
+from sqlalchemy import (
+    DDL,
+    Column,
+    Date,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    event,
+    func,
+)
 from sqlalchemy import Enum as SQLAlchemyEnum
 from sqlalchemy.orm import relationship
 
 from database import Base
 
 
+def utcnow():
+    return datetime.now(timezone.utc)
+
+
 class Empresa(Base):
     __tablename__ = "empresas"
-    __table_args__ = {"extend_existing": True}
+    __table_args__ = (
+        Index(
+            "ix_empresas_nome_trgm",
+            "nome",
+            postgresql_using="gin",
+            postgresql_ops={"nome": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            "ix_empresas_email_trgm",
+            "email",
+            postgresql_using="gin",
+            postgresql_ops={"email": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+        Index("ix_empresas_seq_id", "seq", "id"),
+        {"extend_existing": True},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     nome = Column(String, nullable=False)
@@ -18,12 +49,69 @@ class Empresa(Base):
     email = Column(String, nullable=False)
     telefone = Column(String, nullable=False)
 
-    obrigacoes = relationship("ObrigacaoAcessoria", back_populates="empresa")
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    # Id of the outbox event of the last write; rows from before the outbox
+    # keep 0.
+    seq = Column(Integer, nullable=False, default=0, server_default="0")
+    updated_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        default=utcnow,
+        server_default=func.now(),
+        onupdate=utcnow,
+    )
+
+    __mapper_args__ = {"version_id_col": version}
+
+    obrigacoes = relationship(
+        "ObrigacaoAcessoria",
+        back_populates="empresa",
+        lazy="raise",
+        order_by="ObrigacaoAcessoria.id",
+        passive_deletes=True,
+    )
+
+
+# SQLite has no trigram indexes, so name/email search runs on an FTS5 index
+# kept in sync with empresas by triggers.
+EMPRESAS_BUSCA_SQLITE = [
+    "CREATE VIRTUAL TABLE empresas_busca USING fts5("
+    "nome, email, content='empresas', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE TRIGGER empresas_busca_ai AFTER INSERT ON empresas BEGIN "
+    "INSERT INTO empresas_busca (rowid, nome, email) VALUES (new.id, new.nome, new.email); END",
+    "CREATE TRIGGER empresas_busca_ad AFTER DELETE ON empresas BEGIN "
+    "INSERT INTO empresas_busca (empresas_busca, rowid, nome, email) "
+    "VALUES ('delete', old.id, old.nome, old.email); END",
+    "CREATE TRIGGER empresas_busca_au AFTER UPDATE OF nome, email ON empresas BEGIN "
+    "INSERT INTO empresas_busca (empresas_busca, rowid, nome, email) "
+    "VALUES ('delete', old.id, old.nome, old.email); "
+    "INSERT INTO empresas_busca (rowid, nome, email) VALUES (new.id, new.nome, new.email); END",
+]
+
+event.listen(
+    Empresa.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+
+for statement in EMPRESAS_BUSCA_SQLITE:
+    event.listen(Empresa.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+
+event.listen(
+    Empresa.__table__,
+    "before_drop",
+    DDL("DROP TABLE IF EXISTS empresas_busca").execute_if(dialect="sqlite"),
+)
 
 
 class ObrigacaoAcessoria(Base):
     __tablename__ = "obrigacoes_acessorias"
-    __table_args__ = {"extend_existing": True}
+    __table_args__ = (
+        Index("ix_obrigacoes_acessorias_empresa_id_periodicidade", "empresa_id", "periodicidade"),
+        Index("ix_obrigacoes_acessorias_seq_id", "seq", "id"),
+        {"extend_existing": True},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     nome = Column(String, nullable=False)
@@ -35,5 +123,75 @@ class ObrigacaoAcessoria(Base):
 
     periodicidade = Column(SQLAlchemyEnum(Periodicidade), nullable=False)
 
-    empresa_id = Column(Integer, ForeignKey("empresas.id"))
+    empresa_id = Column(Integer, ForeignKey("empresas.id", ondelete="CASCADE"))
+    data_vencimento = Column(Date, nullable=True)
+
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    seq = Column(Integer, nullable=False, default=0, server_default="0")
+    updated_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        default=utcnow,
+        server_default=func.now(),
+        onupdate=utcnow,
+    )
+
+    __mapper_args__ = {"version_id_col": version}
+
     empresa = relationship(Empresa, back_populates="obrigacoes")
+
+
+class DiaCalendario(Base):
+    __tablename__ = "calendario_dias"
+    __table_args__ = {"extend_existing": True}
+
+    mes = Column(Integer, primary_key=True)
+    dia = Column(Integer, primary_key=True)
+    data = Column(Date, nullable=False)
+
+
+class CalendarioVencimento(Base):
+    __tablename__ = "calendario_vencimentos"
+    __table_args__ = {"extend_existing": True}
+
+    data = Column(Date, primary_key=True)
+    obrigacao_id = Column(
+        Integer,
+        ForeignKey("obrigacoes_acessorias.id", ondelete="CASCADE"),
+        primary_key=True,
+        index=True,
+    )
+
+    obrigacao = relationship(ObrigacaoAcessoria, lazy="raise")
+
+
+class EmpresaResumo(Base):
+    __tablename__ = "empresas_resumo"
+    __table_args__ = {"extend_existing": True}
+
+    empresa_id = Column(Integer, ForeignKey("empresas.id", ondelete="CASCADE"), primary_key=True)
+    mensal = Column(Integer, nullable=False, default=0, server_default="0")
+    trimestral = Column(Integer, nullable=False, default=0, server_default="0")
+    anual = Column(Integer, nullable=False, default=0, server_default="0")
+
+
+class Evento(Base):
+    __tablename__ = "eventos"
+    __table_args__ = (
+        Index("ix_eventos_recurso_operacao_id", "recurso", "operacao", "id"),
+        # Ids are the change sequence, so SQLite must not reuse them once the
+        # newest events are pruned.
+        {"extend_existing": True, "sqlite_autoincrement": True},
+    )
+
+    id = Column(Integer, primary_key=True)
+    recurso = Column(String, nullable=False)
+    recurso_id = Column(Integer, nullable=False)
+    operacao = Column(String, nullable=False)
+    criado_em = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        default=utcnow,
+        server_default=func.now(),
+        index=True,
+    )
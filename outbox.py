@@ -0,0 +1,280 @@
+import asyncio
+import logging
+from datetime import timedelta
+
+from decouple import config
+from sqlalchemy import bindparam, delete, event, func, insert, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+import models
+import schemas
+from database import SessionLocal
+from metrics import Gauge
+
+OUTBOX_POLL_INTERVAL = config("OUTBOX_POLL_INTERVAL", default=0.5, cast=float)
+OUTBOX_BATCH_SIZE = config("OUTBOX_BATCH_SIZE", default=500, cast=int)
+OUTBOX_QUEUE_SIZE = config("OUTBOX_QUEUE_SIZE", default=1000, cast=int)
+OUTBOX_HEARTBEAT = config("OUTBOX_HEARTBEAT", default=15.0, cast=float)
+OUTBOX_RETENTION_DAYS = config("OUTBOX_RETENTION_DAYS", default=7, cast=int)
+OUTBOX_MAX_BACKOFF = config("OUTBOX_MAX_BACKOFF", default=30.0, cast=float)
+
+# Arbitrary key for pg_advisory_xact_lock.
+OUTBOX_LOCK = 4242_0024
+
+SUBSCRIBERS = Gauge("dbide_changes_subscribers", "Assinantes conectados ao feed de alterações")
+
+logger = logging.getLogger("dbide.outbox")
+
+
+MODELS = {"empresa": models.Empresa, "obrigacao": models.ObrigacaoAcessoria}
+
+
+def record_eventos(db, recurso, operacao, ids):
+    # Events are written when the transaction commits, see write_eventos.
+    ids = list(ids)
+
+    if ids:
+        db.info.setdefault("eventos", []).append((recurso, operacao, ids))
+
+
+async def record_obrigacoes_deleted(db, empresa_ids):
+    # ON DELETE CASCADE removes the obligations without the application
+    # seeing them, so their ids are read first. The empresas are locked in
+    # the same query so no obligation can be added to them in between; the
+    # ones found are returned.
+    rows = (
+        await db.execute(
+            select(models.Empresa.id, models.ObrigacaoAcessoria.id)
+            .outerjoin(models.Empresa.obrigacoes)
+            .where(models.Empresa.id.in_(empresa_ids))
+            .with_for_update(of=models.Empresa)
+        )
+    ).all()
+
+    record_eventos(db, "obrigacao", "deleted", [id for _, id in rows if id is not None])
+
+    return {empresa_id for empresa_id, _ in rows}
+
+
+def lock_outbox(connection):
+    # Serial ids are handed out at insert time but become visible at commit,
+    # so two concurrent transactions could commit out of order and the feed
+    # would skip the lower id. Events are inserted under a transaction lock
+    # held until commit, after every row write, so only that last step is
+    # serialized. SQLite already serializes writers.
+    if connection.dialect.name == "postgresql":
+        connection.execute(select(func.pg_advisory_xact_lock(OUTBOX_LOCK)))
+
+
+@event.listens_for(Session, "before_commit")
+def write_eventos(session):
+    pending = session.info.pop("eventos", None)
+
+    if not pending:
+        return
+
+    session.flush()
+    lock_outbox(session.connection())
+
+    for recurso, operacao, ids in pending:
+        rows = [{"recurso": recurso, "recurso_id": id, "operacao": operacao} for id in ids]
+
+        if operacao == "deleted":
+            session.execute(insert(models.Evento), rows)
+            continue
+
+        eventos = session.execute(
+            insert(models.Evento).returning(
+                models.Evento.id, models.Evento.recurso_id, sort_by_parameter_order=True
+            ),
+            rows,
+        )
+
+        # The event id doubles as the row's change sequence, committed together
+        # with it; updated_at is kept so the bookkeeping doesn't count as an edit.
+        table = MODELS[recurso].__table__
+
+        session.execute(
+            update(table)
+            .where(table.c.id == bindparam("b_id"))
+            .values(seq=bindparam("b_seq"), updated_at=table.c.updated_at),
+            [{"b_id": recurso_id, "b_seq": evento_id} for evento_id, recurso_id in eventos],
+        )
+
+
+@event.listens_for(Session, "after_transaction_end")
+def discard_eventos(session, transaction):
+    # Whatever a rolled back or closed transaction recorded goes with it.
+    if transaction.parent is None:
+        session.info.pop("eventos", None)
+
+
+async def prune_eventos(db, days=OUTBOX_RETENTION_DAYS):
+    # The newest event is always kept: its id tells the change endpoints
+    # which tokens still have all their deletions on record.
+    await db.execute(
+        delete(models.Evento).where(
+            models.Evento.criado_em < models.utcnow() - timedelta(days=days),
+            models.Evento.id < select(func.max(models.Evento.id)).scalar_subquery(),
+        )
+    )
+    await db.commit()
+
+
+class ChangeFeed:
+    # One poller per worker reads the outbox and fans events out to the
+    # in-process subscribers, so the database load does not grow with the
+    # number of connected clients.
+    def __init__(
+        self,
+        sessionmaker,
+        poll_interval=OUTBOX_POLL_INTERVAL,
+        batch_size=OUTBOX_BATCH_SIZE,
+        queue_size=OUTBOX_QUEUE_SIZE,
+    ):
+        self.sessionmaker = sessionmaker
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.subscribers = set()
+        self.position = 0
+        self.task = None
+
+    async def fetch(self, after, limit=None):
+        async with self.sessionmaker() as db:
+            eventos = await db.scalars(
+                select(models.Evento)
+                .where(models.Evento.id > after)
+                .order_by(models.Evento.id)
+                .limit(limit or self.batch_size)
+            )
+
+            return [schemas.Evento.model_validate(evento) for evento in eventos]
+
+    async def subscribe(self):
+        if self.task is None:
+            # Positioned before the queue is registered: events up to here
+            # are left to the subscriber's catch-up, later ones are published.
+            async with self.sessionmaker() as db:
+                position = await db.scalar(select(func.max(models.Evento.id))) or 0
+
+            # A concurrent first subscriber may have started the poller in the
+            # meantime; moving its position now would skip events for it.
+            if self.task is None:
+                self.position = position
+
+        queue = asyncio.Queue(self.queue_size)
+
+        self.subscribers.add(queue)
+        SUBSCRIBERS.set(len(self.subscribers))
+
+        if self.task is None:
+            self.task = asyncio.create_task(self.poll())
+
+        return queue
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+        SUBSCRIBERS.set(len(self.subscribers))
+
+    def disconnect(self, queue):
+        # The stream ends on the sentinel and the client reconnects from its
+        # last event id, served from the outbox table.
+        self.unsubscribe(queue)
+
+        if queue.full():
+            queue.get_nowait()
+
+        queue.put_nowait(None)
+
+    def publish(self, evento):
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait(evento)
+            except asyncio.QueueFull:
+                self.disconnect(queue)
+
+    async def poll(self):
+        failures = 0
+
+        try:
+            while self.subscribers:
+                try:
+                    eventos = await self.fetch(self.position)
+                except (SQLAlchemyError, OSError, TimeoutError) as error:
+                    failures += 1
+                    logger.warning("falha ao ler o outbox (tentativa %d): %s", failures, error)
+
+                    await asyncio.sleep(min(self.poll_interval * 2**failures, OUTBOX_MAX_BACKOFF))
+                    continue
+
+                failures = 0
+
+                for evento in eventos:
+                    self.publish(evento)
+
+                if eventos:
+                    self.position = eventos[-1].id
+
+                if len(eventos) < self.batch_size:
+                    await asyncio.sleep(self.poll_interval)
+        finally:
+            self.task = None
+
+            # Anything else stops the poller; its subscribers would only get
+            # heartbeats from then on.
+            for queue in list(self.subscribers):
+                self.disconnect(queue)
+
+    async def stream(self, after=None, recursos=None):
+        queue = await self.subscribe()
+
+        try:
+            position = self.position if after is None else after
+
+            while True:
+                eventos = await self.fetch(position)
+
+                for evento in eventos:
+                    if recursos is None or evento.recurso in recursos:
+                        yield evento
+
+                if eventos:
+                    position = eventos[-1].id
+
+                if len(eventos) < self.batch_size:
+                    break
+
+            while True:
+                try:
+                    evento = await asyncio.wait_for(queue.get(), OUTBOX_HEARTBEAT)
+                except TimeoutError:
+                    yield None
+                    continue
+
+                if evento is None:
+                    return
+
+                if evento.id <= position:
+                    continue
+
+                position = evento.id
+
+                if recursos is None or evento.recurso in recursos:
+                    yield evento
+        finally:
+            self.unsubscribe(queue)
+
+
+def sse(evento):
+    if evento is None:
+        return b": ping\n\n"
+
+    return (
+        f"id: {evento.id}\nevent: {evento.recurso}.{evento.operacao}\n"
+        f"data: {evento.model_dump_json()}\n\n"
+    ).encode()
+
+
+feed = ChangeFeed(SessionLocal)
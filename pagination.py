@@ -0,0 +1,90 @@
+import base64
+import binascii
+from datetime import date
+
+from decouple import config
+from fastapi import Query
+from sqlalchemy import and_, or_, tuple_
+
+DEFAULT_PAGE_SIZE = config("DEFAULT_PAGE_SIZE", default=100, cast=int)
+MAX_PAGE_SIZE = config("MAX_PAGE_SIZE", default=1000, cast=int)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+PARSERS = {date: date.fromisoformat}
+
+
+def encode_cursor(*values):
+    value = ",".join(str(value) for value in values)
+
+    return base64.urlsafe_b64encode(value.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, types=(int,)):
+    try:
+        values = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode().split(",")
+
+        if len(values) != len(types):
+            raise ValueError(cursor)
+
+        return [PARSERS.get(type, type)(value) for type, value in zip(types, values)]
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor(cursor) from None
+
+
+class Pagination:
+    def __init__(
+        self,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: str | None = None,
+    ):
+        self.limit = limit
+        self.cursor = cursor
+
+    def after(self, *columns):
+        if self.cursor is None:
+            return None
+
+        return decode_cursor(self.cursor, [column.type.python_type for column in columns])
+
+    async def paginate(self, db, stmt, *columns):
+        after = self.after(*columns)
+
+        if after is not None:
+            stmt = stmt.where(tuple_(*columns) > tuple_(*after))
+
+        rows = (await db.scalars(stmt.order_by(*columns).limit(self.limit + 1))).all()
+
+        if len(rows) > self.limit:
+            rows = rows[: self.limit]
+
+            return rows, encode_cursor(*(getattr(rows[-1], column.key) for column in columns))
+
+        return rows, None
+
+    async def paginate_ranked(self, db, stmt, score, column):
+        if self.cursor is not None:
+            rank, after = decode_cursor(self.cursor, (float, column.type.python_type))
+            stmt = stmt.where(or_(score < rank, and_(score == rank, column > after)))
+
+        rows = (await db.execute(stmt.order_by(score.desc(), column).limit(self.limit + 1))).all()
+
+        if len(rows) > self.limit:
+            rows = rows[: self.limit]
+            rank, entity = rows[-1].score, rows[-1][0]
+
+            return rows, encode_cursor(rank, getattr(entity, column.key))
+
+        return rows, None
+
+    def set_headers(self, request, response, next_cursor):
+        if next_cursor is None:
+            return
+
+        next_url = request.url.include_query_params(limit=self.limit, cursor=next_cursor)
+
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+        response.headers["X-Next-Cursor"] = next_cursor
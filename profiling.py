@@ -0,0 +1,158 @@
+import contextvars
+import cProfile
+import json
+import logging
+import random
+import threading
+import time
+from pathlib import Path
+
+from decouple import config
+from sqlalchemy import event
+
+DBIDE_PROFILE = config("DBIDE_PROFILE", default=False, cast=bool)
+DBIDE_PROFILE_SLOW_QUERY_MS = config("DBIDE_PROFILE_SLOW_QUERY_MS", default=100, cast=float)
+DBIDE_PROFILE_SAMPLE_RATE = config("DBIDE_PROFILE_SAMPLE_RATE", default=0.0, cast=float)
+DBIDE_PROFILE_DIR = config("DBIDE_PROFILE_DIR", default="profiles")
+
+EXPLAIN = {"sqlite": "EXPLAIN QUERY PLAN ", "postgresql": "EXPLAIN "}
+
+logger = logging.getLogger("dbide.profile")
+
+current_profile = contextvars.ContextVar("current_profile", default=None)
+
+
+class ProfileRecord:
+    def __init__(self, method, path):
+        self.method = method
+        self.path = path
+        self.route = None
+        self.status = None
+        self.seconds = 0.0
+        self.statements = []
+
+    @property
+    def sql_seconds(self):
+        return sum(statement["seconds"] for statement in self.statements)
+
+    def as_dict(self):
+        return {
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "status": self.status,
+            "seconds": self.seconds,
+            "sql_seconds": self.sql_seconds,
+            "statements": self.statements,
+        }
+
+
+def explain(conn, statement, parameters):
+    prefix = EXPLAIN.get(conn.dialect.name)
+
+    if prefix is None:
+        return None
+
+    conn.info["explaining"] = True
+
+    try:
+        rows = conn.exec_driver_sql(prefix + statement, parameters).fetchall()
+    except Exception as error:
+        return [f"EXPLAIN falhou: {error}"]
+    finally:
+        conn.info["explaining"] = False
+
+    return [" ".join(str(column) for column in row) for row in rows]
+
+
+def instrument_profiling(engine, slow_query_ms=DBIDE_PROFILE_SLOW_QUERY_MS):
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("profile_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["profile_start"].pop()
+
+        if conn.info.get("explaining"):
+            return
+
+        record = current_profile.get()
+
+        if record is not None:
+            record.statements.append({"statement": statement, "seconds": elapsed})
+
+        if elapsed * 1000 >= slow_query_ms:
+            plan = None if executemany else explain(conn, statement, parameters)
+
+            logger.warning(
+                "consulta lenta (%.1f ms): %s\n%s",
+                elapsed * 1000,
+                statement,
+                "\n".join(plan or []),
+            )
+
+    return engine
+
+
+class ProfilingMiddleware:
+    # cProfile observes the whole thread, so concurrent requests would pollute
+    # each other's profile; only one sampled request is profiled at a time.
+    _profiler_lock = threading.Lock()
+
+    def __init__(self, app, sample_rate=DBIDE_PROFILE_SAMPLE_RATE, directory=DBIDE_PROFILE_DIR):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.directory = Path(directory)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        record = ProfileRecord(scope["method"], scope["path"])
+        token = current_profile.set(record)
+        profiler = None
+
+        if random.random() < self.sample_rate and self._profiler_lock.acquire(blocking=False):
+            profiler = cProfile.Profile()
+            profiler.enable()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                record.status = message["status"]
+
+            await send(message)
+
+        start = time.perf_counter()
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            record.seconds = time.perf_counter() - start
+            route = scope.get("route")
+            record.route = route.path if route is not None else None
+
+            if profiler is not None:
+                profiler.disable()
+                self._profiler_lock.release()
+                self.dump(profiler, record)
+
+            logger.info("%s", json.dumps(record.as_dict(), ensure_ascii=False))
+
+            current_profile.reset(token)
+
+    def dump(self, profiler, record):
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        name = (record.route or record.path).strip("/").replace("/", "_") or "root"
+        path = self.directory / f"{time.time_ns()}-{record.method}-{name}.pstats"
+
+        profiler.dump_stats(path)
+
+        return path
+
+
+def install(app, engine):
+    instrument_profiling(engine)
+    app.add_middleware(ProfilingMiddleware)
@@ -0,0 +1,201 @@
+import asyncio
+import contextvars
+import itertools
+import logging
+import math
+import time
+
+from decouple import Csv, config
+from fastapi import Depends, Request
+from sqlalchemy import event, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from starlette.datastructures import MutableHeaders
+
+from database import (
+    async_url,
+    engine_options,
+    get_db,
+    instrument_pool,
+    instrument_queries,
+    sqlite_foreign_keys,
+)
+from metrics import Gauge
+
+DATABASE_REPLICA_URLS = config("DATABASE_REPLICA_URLS", default="", cast=Csv())
+DATABASE_REPLICA_CHECK_INTERVAL = config(
+    "DATABASE_REPLICA_CHECK_INTERVAL", default=5.0, cast=float
+)
+DATABASE_REPLICA_CHECK_TIMEOUT = config("DATABASE_REPLICA_CHECK_TIMEOUT", default=1.0, cast=float)
+DATABASE_READ_YOUR_WRITES_SECONDS = config(
+    "DATABASE_READ_YOUR_WRITES_SECONDS", default=5.0, cast=float
+)
+
+LAST_WRITE_COOKIE = "dbide_last_write"
+LAST_WRITE_HEADER = "X-Last-Write"
+
+REPLICA_HEALTHY = Gauge(
+    "dbide_db_replica_healthy", "Réplica respondeu à última verificação", labelnames=["pool"]
+)
+
+logger = logging.getLogger("dbide.replicas")
+
+
+class Replica:
+    def __init__(self, engine, name):
+        self.engine = engine
+        self.name = name
+        self.SessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+        self.healthy = True
+        self.checked_at = -math.inf
+
+    async def ping(self):
+        async with self.engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+
+    async def check(self, interval, timeout):
+        now = time.monotonic()
+
+        if now - self.checked_at < interval:
+            return self.healthy
+
+        # Claimed before awaiting, so concurrent requests don't all probe.
+        self.checked_at = now
+
+        try:
+            await asyncio.wait_for(self.ping(), timeout)
+        except (SQLAlchemyError, OSError, TimeoutError) as error:
+            if self.healthy:
+                logger.warning("réplica %s indisponível: %s", self.name, error)
+
+            self.healthy = False
+        else:
+            self.healthy = True
+
+        REPLICA_HEALTHY.set(int(self.healthy), pool=self.name)
+
+        return self.healthy
+
+
+class ReplicaSet:
+    def __init__(
+        self,
+        engines,
+        check_interval=DATABASE_REPLICA_CHECK_INTERVAL,
+        check_timeout=DATABASE_REPLICA_CHECK_TIMEOUT,
+    ):
+        self.replicas = [
+            Replica(engine, f"replica{index}") for index, engine in enumerate(engines, 1)
+        ]
+        self.check_interval = check_interval
+        self.check_timeout = check_timeout
+        self._next = itertools.count()
+
+    def __bool__(self):
+        return bool(self.replicas)
+
+    async def sessionmaker(self):
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[next(self._next) % len(self.replicas)]
+
+            if await replica.check(self.check_interval, self.check_timeout):
+                return replica.SessionLocal
+
+        return None
+
+    async def dispose(self):
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+
+def replica_engine(url, name):
+    return instrument_queries(
+        instrument_pool(
+            sqlite_foreign_keys(create_async_engine(async_url(url), **engine_options(url, name))),
+            name,
+        )
+    )
+
+
+replicas = ReplicaSet(
+    replica_engine(url, f"replica{index}") for index, url in enumerate(DATABASE_REPLICA_URLS, 1)
+)
+
+
+def wrote_recently(request, window=DATABASE_READ_YOUR_WRITES_SECONDS):
+    value = request.headers.get(LAST_WRITE_HEADER) or request.cookies.get(LAST_WRITE_COOKIE)
+
+    try:
+        return time.time() - float(value) < window
+    except (TypeError, ValueError):
+        return False
+
+
+async def get_read_db(request: Request, db: AsyncSession = Depends(get_db)):
+    sessionmaker = None
+
+    if replicas and not wrote_recently(request):
+        sessionmaker = await replicas.sessionmaker()
+
+    if sessionmaker is None:
+        yield db
+        return
+
+    replica_db = sessionmaker()
+
+    try:
+        yield replica_db
+    finally:
+        await replica_db.close()
+
+
+class WriteState:
+    def __init__(self):
+        self.committed = False
+
+
+current_writes = contextvars.ContextVar("current_writes", default=None)
+
+
+@event.listens_for(Session, "after_commit")
+def after_commit(session):
+    state = current_writes.get()
+
+    if state is not None:
+        state.committed = True
+
+
+class ReadYourWritesMiddleware:
+    # Clients that just committed something carry the write time back, in
+    # the cookie or the header, and get_read_db keeps them on the primary
+    # until the replicas have had time to catch up.
+    def __init__(self, app, window=DATABASE_READ_YOUR_WRITES_SECONDS):
+        self.app = app
+        self.window = window
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not replicas:
+            await self.app(scope, receive, send)
+            return
+
+        state = WriteState()
+        token = current_writes.set(state)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and state.committed:
+                value = f"{time.time():.3f}"
+                headers = MutableHeaders(scope=message)
+                headers[LAST_WRITE_HEADER] = value
+                headers.append(
+                    "Set-Cookie",
+                    f"{LAST_WRITE_COOKIE}={value}; Max-Age={math.ceil(self.window)}; "
+                    "Path=/; HttpOnly; SameSite=Lax",
+                )
+
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_writes.reset(token)
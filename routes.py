@@ -1,69 +1,466 @@
-from fastapi import APIRouter, Depends
-from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
+from datetime import date
+from typing import Literal
+
+from decouple import config
+from fastapi import APIRouter, Body, Depends, Header, Query, Request, Response
+from fastapi.responses import ORJSONResponse, PlainTextResponse, StreamingResponse
+from sqlalchemy import delete, insert, literal, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import contains_eager, selectinload
 
 import models
 import schemas
-from database import get_db
+from cache import empresa_cache
+from conditional import (
+    collection_etag,
+    conditional_response,
+    if_match_versions,
+    last_modified,
+    resource_etag,
+)
+from database import dialect_insert, get_db, scalars_in
+from due_dates import CALENDAR_HORIZON_DAYS, update_due_dates, within_horizon
+from export import ExportFormat, export_response
+from metrics import REGISTRY
+from outbox import feed, record_eventos, record_obrigacoes_deleted, sse
+from pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursor, Pagination
+from replicas import get_read_db
+from search import search_query
+from serialization import orm_response
+from summary import create_resumos, summary_deltas, update_resumos
+from sync import ExpiredToken, read_changes
+
+BULK_CHUNK_SIZE = config("BULK_CHUNK_SIZE", default=1000, cast=int)
+BATCH_MAX_IDS = config("BATCH_MAX_IDS", default=1000, cast=int)
+
+Include = Literal["obrigacoes"]
+
+
+def empresas_stmt(include):
+    stmt = select(models.Empresa)
+
+    if include == "obrigacoes":
+        stmt = stmt.options(selectinload(models.Empresa.obrigacoes))
+
+    return stmt
+
+
+async def batch_response(db, schema, stmt, column, ids):
+    ids = list(dict.fromkeys(ids))
+    rows = await scalars_in(db, stmt, column, ids, BULK_CHUNK_SIZE)
+    found = {getattr(row, column.key): row for row in rows}
+
+    return orm_response(
+        schemas.Batch[schema],
+        {
+            "items": [found[id] for id in ids if id in found],
+            "not_found": [id for id in ids if id not in found],
+        },
+    )
+
+
+async def missing_empresa(db, empresa_id):
+    # The cache answered for an empresa deleted since; the foreign key caught it.
+    await db.rollback()
+    await empresa_cache.invalidate(empresa_id)
+
+    return ORJSONResponse({"message": f"Empresa com id {empresa_id} não existe"}, 400)
+
+
+async def changes_response(db, schema, model, recurso, since, limit):
+    try:
+        items, deleted, since, has_more = await read_changes(db, model, recurso, since, limit)
+    except InvalidCursor:
+        return ORJSONResponse({"message": "Token inválido"}, 400)
+    except ExpiredToken:
+        return ORJSONResponse(
+            {"message": "Token expirado, sincronize novamente sem o parâmetro since"}, 410
+        )
+
+    return orm_response(
+        schemas.Changes[schema],
+        {"items": items, "deleted": deleted, "since": since, "has_more": has_more},
+    )
+
+
+async def delete_chunked(db, model, criteria, *returning):
+    # Each chunk is its own short transaction, so a large delete never holds
+    # locks on every matching row at once.
+    while True:
+        chunk = select(model.id).where(*criteria).limit(BULK_CHUNK_SIZE)
+        rows = (
+            await db.execute(delete(model).where(model.id.in_(chunk)).returning(*returning))
+        ).all()
+
+        yield rows
+
+        await db.commit()
+
+        if len(rows) < BULK_CHUNK_SIZE:
+            break
 
 
 class EmpresaRoutes:
     router = APIRouter(tags=["empresas"])
 
     @router.post("/empresas/", response_model=schemas.Empresa, status_code=201)
-    async def create_empresa(empresa: schemas.EmpresaCreate, db: Session = Depends(get_db)):
-        if db.query(models.Empresa).filter(models.Empresa.cnpj == empresa.cnpj).first():
-            return JSONResponse({"message": "Empresa já cadastrada"}, 400)
+    async def create_empresa(empresa: schemas.EmpresaCreate, db: AsyncSession = Depends(get_db)):
+        # A single statement both checks and inserts, so concurrent requests
+        # for the same CNPJ cannot race past each other.
+        orm_empresa = await db.scalar(
+            dialect_insert(db, models.Empresa)
+            .values(**empresa.model_dump())
+            .on_conflict_do_nothing(index_elements=[models.Empresa.cnpj])
+            .returning(models.Empresa)
+        )
 
-        orm_empresa = models.Empresa(**empresa.model_dump())
+        if orm_empresa is None:
+            return ORJSONResponse({"message": "Empresa já cadastrada"}, 400)
 
-        db.add(orm_empresa)
-        db.commit()
-        db.refresh(orm_empresa)
+        await create_resumos(db, [orm_empresa.id])
+        record_eventos(db, "empresa", "created", [orm_empresa.id])
+        await db.commit()
 
         return orm_empresa
 
-    @router.get("/empresas/", response_model=list[schemas.Empresa])
-    async def read_empresas(db: Session = Depends(get_db)):
-        orm_empresas = db.query(models.Empresa).all()
+    @router.post("/empresas/bulk", response_model=list[schemas.EmpresaBulkResult])
+    async def bulk_upsert_empresas(
+        empresas: list[schemas.EmpresaCreate],
+        on_conflict: Literal["update", "ignore"] = "update",
+        db: AsyncSession = Depends(get_db),
+    ):
+        results = []
+        seen = set()
+        rows = []
+
+        for index, empresa in enumerate(empresas):
+            if empresa.cnpj in seen:
+                results.append(
+                    schemas.EmpresaBulkResult(
+                        index=index, cnpj=empresa.cnpj, id=None, status="conflict"
+                    )
+                )
+                continue
+
+            seen.add(empresa.cnpj)
+            rows.append((index, empresa.model_dump()))
+
+        for start in range(0, len(rows), BULK_CHUNK_SIZE):
+            chunk = rows[start : start + BULK_CHUNK_SIZE]
+            cnpjs = [row["cnpj"] for _, row in chunk]
+
+            existing = dict(
+                (
+                    await db.execute(
+                        select(models.Empresa.cnpj, models.Empresa.id).where(
+                            models.Empresa.cnpj.in_(cnpjs)
+                        )
+                    )
+                ).all()
+            )
 
-        return orm_empresas
+            stmt = dialect_insert(db, models.Empresa).values([row for _, row in chunk])
+
+            if on_conflict == "update":
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[models.Empresa.cnpj],
+                    set_={
+                        **{key: stmt.excluded[key] for key in chunk[0][1] if key != "cnpj"},
+                        "version": models.Empresa.version + 1,
+                        "updated_at": models.utcnow(),
+                    },
+                )
+            else:
+                stmt = stmt.on_conflict_do_nothing(index_elements=[models.Empresa.cnpj])
+
+            ids = dict(
+                (await db.execute(stmt.returning(models.Empresa.cnpj, models.Empresa.id))).all()
+            )
 
-    @router.get("/empresas/{empresa_id}", response_model=schemas.Empresa)
-    async def read_empresa(empresa_id: int, db: Session = Depends(get_db)):
-        orm_empresa = db.get(models.Empresa, empresa_id)
+            inserted = [ids[cnpj] for cnpj in ids if cnpj not in existing]
 
-        if orm_empresa is None:
-            return JSONResponse({"message": "Empresa não encontrada"}, 404)
+            await create_resumos(db, inserted)
+            record_eventos(db, "empresa", "created", inserted)
+            record_eventos(
+                db, "empresa", "updated", [ids[cnpj] for cnpj in ids if cnpj in existing]
+            )
 
-        return orm_empresa
+            for index, row in chunk:
+                cnpj = row["cnpj"]
+
+                if cnpj not in existing:
+                    status = "inserted"
+                elif on_conflict == "update":
+                    status = "updated"
+                else:
+                    status = "conflict"
+
+                results.append(
+                    schemas.EmpresaBulkResult(
+                        index=index, cnpj=cnpj, id=ids.get(cnpj, existing.get(cnpj)), status=status
+                    )
+                )
+
+        await db.commit()
+
+        for result in results:
+            if result.status == "updated":
+                await empresa_cache.invalidate(result.id)
+
+        return sorted(results, key=lambda result: result.index)
+
+    @router.get("/empresas/", response_model=list[schemas.EmpresaComObrigacoes | schemas.Empresa])
+    async def read_empresas(
+        request: Request,
+        response: Response,
+        include: Include | None = None,
+        pagination: Pagination = Depends(),
+        db: AsyncSession = Depends(get_read_db),
+    ):
+        try:
+            orm_empresas, next_cursor = await pagination.paginate(
+                db, empresas_stmt(include), models.Empresa.id
+            )
+        except InvalidCursor:
+            return ORJSONResponse({"message": "Cursor inválido"}, 400)
+
+        pagination.set_headers(request, response, next_cursor)
+
+        versioned = list(orm_empresas)
+
+        if include == "obrigacoes":
+            versioned += [o for orm_empresa in orm_empresas for o in orm_empresa.obrigacoes]
+
+        not_modified = conditional_response(
+            request, response, collection_etag(versioned), last_modified(versioned)
+        )
+
+        if not_modified:
+            return not_modified
+
+        if include == "obrigacoes":
+            return orm_response(list[schemas.EmpresaComObrigacoes], orm_empresas, response)
+
+        return orm_response(list[schemas.Empresa], orm_empresas, response)
+
+    @router.delete("/empresas/", response_model=schemas.BulkDeleteResult)
+    async def bulk_delete_empresas(
+        ids: list[int] = Query(min_length=1, max_length=BATCH_MAX_IDS),
+        db: AsyncSession = Depends(get_db),
+    ):
+        ids = list(dict.fromkeys(ids))
+        deleted = []
+
+        for start in range(0, len(ids), BULK_CHUNK_SIZE):
+            chunk = ids[start : start + BULK_CHUNK_SIZE]
+
+            await record_obrigacoes_deleted(db, chunk)
+
+            rows = (
+                await db.scalars(
+                    delete(models.Empresa)
+                    .where(models.Empresa.id.in_(chunk))
+                    .returning(models.Empresa.id)
+                )
+            ).all()
+
+            record_eventos(db, "empresa", "deleted", rows)
+            await db.commit()
+
+            deleted += rows
+
+        for empresa_id in deleted:
+            await empresa_cache.invalidate(empresa_id)
+
+        return schemas.BulkDeleteResult(deleted=len(deleted))
+
+    @router.get("/empresas/resumo", response_model=list[schemas.EmpresaResumo])
+    async def read_resumos(
+        request: Request,
+        response: Response,
+        pagination: Pagination = Depends(),
+        db: AsyncSession = Depends(get_read_db),
+    ):
+        try:
+            orm_resumos, next_cursor = await pagination.paginate(
+                db, select(models.EmpresaResumo), models.EmpresaResumo.empresa_id
+            )
+        except InvalidCursor:
+            return ORJSONResponse({"message": "Cursor inválido"}, 400)
+
+        pagination.set_headers(request, response, next_cursor)
+
+        return orm_response(list[schemas.EmpresaResumo], orm_resumos, response)
+
+    @router.get("/empresas/search", response_model=list[schemas.Empresa])
+    async def search_empresas(
+        request: Request,
+        response: Response,
+        q: str = Query(pattern=r"\w"),
+        pagination: Pagination = Depends(),
+        db: AsyncSession = Depends(get_read_db),
+    ):
+        stmt, score = search_query(db, q.strip())
+
+        try:
+            rows, next_cursor = await pagination.paginate_ranked(
+                db, stmt, score, models.Empresa.id
+            )
+        except InvalidCursor:
+            return ORJSONResponse({"message": "Cursor inválido"}, 400)
+
+        pagination.set_headers(request, response, next_cursor)
+
+        return orm_response(list[schemas.Empresa], [row[0] for row in rows], response)
+
+    @router.get(
+        "/empresas/batch",
+        response_model=schemas.Batch[schemas.EmpresaComObrigacoes]
+        | schemas.Batch[schemas.Empresa],
+    )
+    async def read_empresas_batch(
+        ids: list[int] = Query(min_length=1, max_length=BATCH_MAX_IDS),
+        include: Include | None = None,
+        db: AsyncSession = Depends(get_read_db),
+    ):
+        schema = schemas.EmpresaComObrigacoes if include == "obrigacoes" else schemas.Empresa
+
+        return await batch_response(db, schema, empresas_stmt(include), models.Empresa.id, ids)
+
+    @router.post(
+        "/empresas/batch",
+        response_model=schemas.Batch[schemas.EmpresaComObrigacoes]
+        | schemas.Batch[schemas.Empresa],
+    )
+    async def post_empresas_batch(
+        ids: list[int] = Body(min_length=1, max_length=BATCH_MAX_IDS),
+        include: Include | None = None,
+        db: AsyncSession = Depends(get_read_db),
+    ):
+        schema = schemas.EmpresaComObrigacoes if include == "obrigacoes" else schemas.Empresa
+
+        return await batch_response(db, schema, empresas_stmt(include), models.Empresa.id, ids)
+
+    @router.get("/empresas/changes", response_model=schemas.Changes[schemas.Empresa])
+    async def read_empresas_changes(
+        since: str | None = None,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        db: AsyncSession = Depends(get_read_db),
+    ):
+        return await changes_response(db, schemas.Empresa, models.Empresa, "empresa", since, limit)
+
+    @router.get("/empresas/export", response_class=StreamingResponse)
+    async def export_empresas(
+        format: ExportFormat = "ndjson", db: AsyncSession = Depends(get_read_db)
+    ):
+        return export_response(
+            db.bind,
+            select(models.Empresa.__table__).order_by(models.Empresa.id),
+            schemas.Empresa,
+            format,
+            "empresas",
+        )
+
+    @router.get(
+        "/empresas/{empresa_id}", response_model=schemas.EmpresaComObrigacoes | schemas.Empresa
+    )
+    async def read_empresa(
+        request: Request,
+        response: Response,
+        empresa_id: int,
+        include: Include | None = None,
+        db: AsyncSession = Depends(get_db),
+        read_db: AsyncSession = Depends(get_read_db),
+    ):
+        if include == "obrigacoes":
+            empresa = await read_db.get(
+                models.Empresa, empresa_id, options=[selectinload(models.Empresa.obrigacoes)]
+            )
+        else:
+            # The shared cache is filled from the primary: a lagging replica
+            # would keep serving a stale empresa to everyone until it expires.
+            empresa = await empresa_cache.get(db, empresa_id)
+
+        if empresa is None:
+            return ORJSONResponse({"message": "Empresa não encontrada"}, 404)
+
+        if include == "obrigacoes":
+            versioned = [empresa, *empresa.obrigacoes]
+            etag = collection_etag(versioned)
+        else:
+            versioned = [empresa]
+            etag = resource_etag(empresa)
+
+        not_modified = conditional_response(request, response, etag, last_modified(versioned))
+
+        if not_modified:
+            return not_modified
+
+        if include == "obrigacoes":
+            return orm_response(schemas.EmpresaComObrigacoes, empresa, response)
+
+        return orm_response(schemas.Empresa, empresa, response)
+
+    @router.get("/empresas/{empresa_id}/resumo", response_model=schemas.EmpresaResumo)
+    async def read_resumo(empresa_id: int, db: AsyncSession = Depends(get_read_db)):
+        orm_resumo = await db.get(models.EmpresaResumo, empresa_id)
+
+        if orm_resumo is None:
+            return ORJSONResponse({"message": "Empresa não encontrada"}, 404)
+
+        return orm_response(schemas.EmpresaResumo, orm_resumo)
 
     @router.put("/empresas/{empresa_id}", response_model=schemas.Empresa)
     async def update_empresa(
-        empresa_id: int, empresa: schemas.EmpresaUpdate, db: Session = Depends(get_db)
+        request: Request,
+        response: Response,
+        empresa_id: int,
+        empresa: schemas.EmpresaUpdate,
+        db: AsyncSession = Depends(get_db),
     ):
-        orm_empresa = db.get(models.Empresa, empresa_id)
+        stmt = update(models.Empresa).where(models.Empresa.id == empresa_id)
+        versions = if_match_versions(request, empresa_id)
+
+        if versions is not None:
+            stmt = stmt.where(models.Empresa.version.in_(versions))
+
+        orm_empresa = await db.scalar(
+            stmt.values(
+                **empresa.model_dump(),
+                version=models.Empresa.version + 1,
+                updated_at=models.utcnow(),
+            ).returning(models.Empresa)
+        )
 
         if orm_empresa is None:
-            return JSONResponse({"message": "Empresa não encontrada"}, 404)
+            if versions is not None and await db.get(models.Empresa, empresa_id) is not None:
+                return ORJSONResponse(
+                    {"message": "Empresa foi alterada por outra requisição"}, 412
+                )
 
-        for key, value in empresa.model_dump().items():
-            setattr(orm_empresa, key, value)
+            return ORJSONResponse({"message": "Empresa não encontrada"}, 404)
 
-        db.commit()
-        db.refresh(orm_empresa)
+        record_eventos(db, "empresa", "updated", [orm_empresa.id])
+        await db.commit()
+        await empresa_cache.invalidate(orm_empresa.id)
+
+        response.headers["ETag"] = resource_etag(orm_empresa)
 
         return orm_empresa
 
     @router.delete("/empresas/{empresa_id}", status_code=204)
-    async def delete_empresa(empresa_id: int, db: Session = Depends(get_db)):
-        orm_empresa = db.get(models.Empresa, empresa_id)
-
-        if orm_empresa is None:
-            return JSONResponse({"message": "Empresa não encontrada"}, 404)
+    async def delete_empresa(empresa_id: int, db: AsyncSession = Depends(get_db)):
+        # Obligations, their due dates and the summary row go with the
+        # empresa through ON DELETE CASCADE. A missing empresa has no
+        # obligations to record, and answers 404 before anything is deleted.
+        if not await record_obrigacoes_deleted(db, [empresa_id]):
+            return ORJSONResponse({"message": "Empresa não encontrada"}, 404)
 
-        db.delete(orm_empresa)
-        db.commit()
+        await db.execute(delete(models.Empresa).where(models.Empresa.id == empresa_id))
+        record_eventos(db, "empresa", "deleted", [empresa_id])
+        await db.commit()
+        await empresa_cache.invalidate(empresa_id)
 
 
 class ObrigacaoAcessoriaRoutes:
@@ -71,86 +468,455 @@ class ObrigacaoAcessoriaRoutes:
 
     @router.post("/obrigacoes/", response_model=schemas.ObrigacaoAcessoria, status_code=201)
     async def create_obrigacao(
-        obrigacao: schemas.ObrigacaoAcessoriaCreate, db: Session = Depends(get_db)
+        obrigacao: schemas.ObrigacaoAcessoriaCreate, db: AsyncSession = Depends(get_db)
     ):
         if obrigacao.periodicidade not in ["mensal", "trimestral", "anual"]:
-            return JSONResponse(
+            return ORJSONResponse(
                 {
                     "message": "O campo periodicidade deve ser uma das seguintes opções (mensal, trimestral, anual)"
                 },
                 400,
             )
 
-        orm_empresa = db.get(models.Empresa, obrigacao.empresa_id)
-
-        if orm_empresa is None:
-            return JSONResponse(
+        if await empresa_cache.get(db, obrigacao.empresa_id) is None:
+            return ORJSONResponse(
                 {"message": f"Empresa com id {obrigacao.empresa_id} não existe"}, 400
             )
 
         orm_obrigacao = models.ObrigacaoAcessoria(**obrigacao.model_dump())
 
         db.add(orm_obrigacao)
-        db.commit()
-        db.refresh(orm_obrigacao)
+
+        try:
+            await db.flush()
+        except IntegrityError:
+            return await missing_empresa(db, obrigacao.empresa_id)
+
+        # A new obligation has no calendar rows to replace without a due date.
+        if orm_obrigacao.data_vencimento is not None:
+            await update_due_dates(db, [orm_obrigacao.id])
+
+        await update_resumos(db, summary_deltas([(obrigacao.empresa_id, obrigacao.periodicidade)]))
+        record_eventos(db, "obrigacao", "created", [orm_obrigacao.id])
+        await db.commit()
+        await db.refresh(orm_obrigacao)
 
         return orm_obrigacao
 
+    @router.post("/obrigacoes/bulk", response_model=list[schemas.ObrigacaoAcessoriaBulkResult])
+    async def bulk_create_obrigacoes(
+        obrigacoes: list[schemas.ObrigacaoAcessoriaCreate],
+        db: AsyncSession = Depends(get_db),
+    ):
+        periodicidades = {p.value for p in models.ObrigacaoAcessoria.Periodicidade}
+        empresa_ids = list({obrigacao.empresa_id for obrigacao in obrigacoes})
+        existing = set()
+
+        for start in range(0, len(empresa_ids), BULK_CHUNK_SIZE):
+            existing.update(
+                await db.scalars(
+                    select(models.Empresa.id).where(
+                        models.Empresa.id.in_(empresa_ids[start : start + BULK_CHUNK_SIZE])
+                    )
+                )
+            )
+
+        results = []
+        valid = []
+
+        for index, obrigacao in enumerate(obrigacoes):
+            if obrigacao.periodicidade not in periodicidades:
+                message = "O campo periodicidade deve ser uma das seguintes opções (mensal, trimestral, anual)"
+            elif obrigacao.empresa_id not in existing:
+                message = f"Empresa com id {obrigacao.empresa_id} não existe"
+            else:
+                message = None
+
+            result = schemas.ObrigacaoAcessoriaBulkResult(
+                index=index, id=None, status="error" if message else "created", message=message
+            )
+            results.append(result)
+
+            if message is None:
+                valid.append((result, obrigacao.model_dump()))
+
+        for start in range(0, len(valid), BULK_CHUNK_SIZE):
+            chunk = valid[start : start + BULK_CHUNK_SIZE]
+
+            ids = await db.scalars(
+                insert(models.ObrigacaoAcessoria).returning(
+                    models.ObrigacaoAcessoria.id, sort_by_parameter_order=True
+                ),
+                [row for _, row in chunk],
+            )
+
+            for (result, _), obrigacao_id in zip(chunk, ids):
+                result.id = obrigacao_id
+
+            dated = [result.id for result, row in chunk if row["data_vencimento"] is not None]
+
+            if dated:
+                await update_due_dates(db, dated)
+
+            await update_resumos(
+                db, summary_deltas((row["empresa_id"], row["periodicidade"]) for _, row in chunk)
+            )
+            record_eventos(db, "obrigacao", "created", [result.id for result, _ in chunk])
+
+        await db.commit()
+
+        return results
+
     @router.get("/obrigacoes/", response_model=list[schemas.ObrigacaoAcessoria])
-    async def read_obrigacoes(db: Session = Depends(get_db)):
-        orm_obrigacoes = db.query(models.ObrigacaoAcessoria).all()
+    async def read_obrigacoes(
+        request: Request,
+        response: Response,
+        empresa_id: int | None = None,
+        periodicidade: models.ObrigacaoAcessoria.Periodicidade | None = None,
+        nome: str | None = None,
+        pagination: Pagination = Depends(),
+        db: AsyncSession = Depends(get_read_db),
+    ):
+        stmt = select(models.ObrigacaoAcessoria)
+
+        if empresa_id is not None:
+            stmt = stmt.where(models.ObrigacaoAcessoria.empresa_id == empresa_id)
+
+        if periodicidade is not None:
+            stmt = stmt.where(models.ObrigacaoAcessoria.periodicidade == periodicidade)
+
+        if nome is not None:
+            stmt = stmt.where(models.ObrigacaoAcessoria.nome == nome)
+
+        try:
+            orm_obrigacoes, next_cursor = await pagination.paginate(
+                db, stmt, models.ObrigacaoAcessoria.id
+            )
+        except InvalidCursor:
+            return ORJSONResponse({"message": "Cursor inválido"}, 400)
+
+        pagination.set_headers(request, response, next_cursor)
+
+        not_modified = conditional_response(
+            request, response, collection_etag(orm_obrigacoes), last_modified(orm_obrigacoes)
+        )
+
+        return not_modified or orm_response(
+            list[schemas.ObrigacaoAcessoria], orm_obrigacoes, response
+        )
+
+    @router.delete("/obrigacoes/", response_model=schemas.BulkDeleteResult)
+    async def bulk_delete_obrigacoes(
+        ids: list[int] | None = Query(None, max_length=BATCH_MAX_IDS),
+        empresa_id: int | None = None,
+        periodicidade: models.ObrigacaoAcessoria.Periodicidade | None = None,
+        nome: str | None = None,
+        db: AsyncSession = Depends(get_db),
+    ):
+        criteria = []
+
+        if ids is not None:
+            criteria.append(models.ObrigacaoAcessoria.id.in_(ids))
+
+        if empresa_id is not None:
+            criteria.append(models.ObrigacaoAcessoria.empresa_id == empresa_id)
+
+        if periodicidade is not None:
+            criteria.append(models.ObrigacaoAcessoria.periodicidade == periodicidade)
+
+        if nome is not None:
+            criteria.append(models.ObrigacaoAcessoria.nome == nome)
+
+        if not criteria:
+            return ORJSONResponse(
+                {"message": "Informe ids ou ao menos um filtro (empresa_id, periodicidade, nome)"},
+                400,
+            )
+
+        deleted = 0
+
+        async for rows in delete_chunked(
+            db,
+            models.ObrigacaoAcessoria,
+            criteria,
+            models.ObrigacaoAcessoria.id,
+            models.ObrigacaoAcessoria.empresa_id,
+            models.ObrigacaoAcessoria.periodicidade,
+        ):
+            await update_resumos(
+                db, summary_deltas(((empresa_id, p) for _, empresa_id, p in rows), sign=-1)
+            )
+            record_eventos(
+                db, "obrigacao", "deleted", [obrigacao_id for obrigacao_id, _, _ in rows]
+            )
+
+            deleted += len(rows)
+
+        return schemas.BulkDeleteResult(deleted=deleted)
 
-        return orm_obrigacoes
+    @router.get("/obrigacoes/batch", response_model=schemas.Batch[schemas.ObrigacaoAcessoria])
+    async def read_obrigacoes_batch(
+        ids: list[int] = Query(min_length=1, max_length=BATCH_MAX_IDS),
+        db: AsyncSession = Depends(get_read_db),
+    ):
+        return await batch_response(
+            db,
+            schemas.ObrigacaoAcessoria,
+            select(models.ObrigacaoAcessoria),
+            models.ObrigacaoAcessoria.id,
+            ids,
+        )
+
+    @router.post("/obrigacoes/batch", response_model=schemas.Batch[schemas.ObrigacaoAcessoria])
+    async def post_obrigacoes_batch(
+        ids: list[int] = Body(min_length=1, max_length=BATCH_MAX_IDS),
+        db: AsyncSession = Depends(get_read_db),
+    ):
+        return await batch_response(
+            db,
+            schemas.ObrigacaoAcessoria,
+            select(models.ObrigacaoAcessoria),
+            models.ObrigacaoAcessoria.id,
+            ids,
+        )
+
+    @router.get("/obrigacoes/changes", response_model=schemas.Changes[schemas.ObrigacaoAcessoria])
+    async def read_obrigacoes_changes(
+        since: str | None = None,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        db: AsyncSession = Depends(get_read_db),
+    ):
+        return await changes_response(
+            db, schemas.ObrigacaoAcessoria, models.ObrigacaoAcessoria, "obrigacao", since, limit
+        )
+
+    @router.get("/obrigacoes/export", response_class=StreamingResponse)
+    async def export_obrigacoes(
+        format: ExportFormat = "ndjson", db: AsyncSession = Depends(get_read_db)
+    ):
+        return export_response(
+            db.bind,
+            select(models.ObrigacaoAcessoria.__table__).order_by(models.ObrigacaoAcessoria.id),
+            schemas.ObrigacaoAcessoria,
+            format,
+            "obrigacoes",
+        )
+
+    @router.get("/obrigacoes/vencimentos", response_model=list[schemas.Vencimento])
+    async def read_vencimentos(
+        request: Request,
+        response: Response,
+        de: date,
+        ate: date,
+        empresa_id: int | None = None,
+        pagination: Pagination = Depends(),
+        db: AsyncSession = Depends(get_read_db),
+    ):
+        if de > ate:
+            return ORJSONResponse({"message": "A data inicial deve ser anterior à final"}, 400)
+
+        if not within_horizon(ate):
+            return ORJSONResponse(
+                {
+                    "message": f"O calendário de vencimentos cobre até {CALENDAR_HORIZON_DAYS} dias à frente"
+                },
+                400,
+            )
+
+        stmt = (
+            select(models.CalendarioVencimento)
+            .join(models.CalendarioVencimento.obrigacao)
+            .options(contains_eager(models.CalendarioVencimento.obrigacao))
+            .where(models.CalendarioVencimento.data.between(de, ate))
+        )
+
+        if empresa_id is not None:
+            stmt = stmt.where(models.ObrigacaoAcessoria.empresa_id == empresa_id)
+
+        try:
+            orm_vencimentos, next_cursor = await pagination.paginate(
+                db,
+                stmt,
+                models.CalendarioVencimento.data,
+                models.CalendarioVencimento.obrigacao_id,
+            )
+        except InvalidCursor:
+            return ORJSONResponse({"message": "Cursor inválido"}, 400)
+
+        pagination.set_headers(request, response, next_cursor)
+
+        return orm_response(list[schemas.Vencimento], orm_vencimentos, response)
 
     @router.get("/obrigacoes/{obrigacao_id}", response_model=schemas.ObrigacaoAcessoria)
-    async def read_obrigacao(obrigacao_id: int, db: Session = Depends(get_db)):
-        orm_obrigacao = db.get(models.ObrigacaoAcessoria, obrigacao_id)
+    async def read_obrigacao(
+        request: Request,
+        response: Response,
+        obrigacao_id: int,
+        db: AsyncSession = Depends(get_read_db),
+    ):
+        orm_obrigacao = await db.get(models.ObrigacaoAcessoria, obrigacao_id)
 
         if orm_obrigacao is None:
-            return JSONResponse({"message": "Obrigação Acessória não encontrada"}, 404)
+            return ORJSONResponse({"message": "Obrigação Acessória não encontrada"}, 404)
 
-        return orm_obrigacao
+        not_modified = conditional_response(
+            request, response, resource_etag(orm_obrigacao), last_modified([orm_obrigacao])
+        )
+
+        return not_modified or orm_response(schemas.ObrigacaoAcessoria, orm_obrigacao, response)
 
     @router.put("/obrigacoes/{obrigacao_id}", response_model=schemas.ObrigacaoAcessoria)
     async def update_obrigacao(
+        request: Request,
+        response: Response,
         obrigacao_id: int,
         obrigacao: schemas.ObrigacaoAcessoriaUpdate,
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_db),
     ):
-        orm_obrigacao = db.get(models.ObrigacaoAcessoria, obrigacao_id)
+        if obrigacao.periodicidade not in ["mensal", "trimestral", "anual"]:
+            message = "O campo periodicidade deve ser uma das seguintes opções (mensal, trimestral, anual)"
+        elif await empresa_cache.get(db, obrigacao.empresa_id) is None:
+            message = f"Empresa com id {obrigacao.empresa_id} não existe"
+        else:
+            message = None
+
+        # A missing obligation answers 404 before any validation error; the
+        # lookup is only paid on the error path.
+        if message is not None:
+            if await db.get(models.ObrigacaoAcessoria, obrigacao_id) is None:
+                return ORJSONResponse({"message": "Obrigação Acessória não encontrada"}, 404)
+
+            return ORJSONResponse({"message": message}, 400)
+
+        previous = (
+            select(
+                models.ObrigacaoAcessoria.id,
+                models.ObrigacaoAcessoria.empresa_id,
+                models.ObrigacaoAcessoria.periodicidade,
+            )
+            .where(models.ObrigacaoAcessoria.id == obrigacao_id)
+            .with_for_update()
+        )
+        returning = [models.ObrigacaoAcessoria]
+
+        if db.bind.dialect.name == "postgresql":
+            # The old empresa and periodicidade come back from the UPDATE
+            # itself, read under the row lock, so the summary moves the right
+            # counters without another round trip.
+            previous = previous.subquery("previous")
+            stmt = update(models.ObrigacaoAcessoria).where(
+                models.ObrigacaoAcessoria.id == previous.c.id
+            )
+            returning += [previous.c.empresa_id, previous.c.periodicidade]
+        else:
+            # SQLite can't return columns of the FROM tables; it serializes
+            # writers, so reading first is just as safe there.
+            old = (await db.execute(previous)).one_or_none()
 
-        if orm_obrigacao is None:
-            return JSONResponse({"message": "Obrigação Acessória não encontrada"}, 404)
+            if old is None:
+                return ORJSONResponse({"message": "Obrigação Acessória não encontrada"}, 404)
 
-        if obrigacao.periodicidade not in ["mensal", "trimestral", "anual"]:
-            return JSONResponse(
-                {
-                    "message": "O campo periodicidade deve ser uma das seguintes opções (mensal, trimestral, anual)"
-                },
-                400,
+            stmt = update(models.ObrigacaoAcessoria).where(
+                models.ObrigacaoAcessoria.id == obrigacao_id
             )
+            returning += [
+                literal(old.empresa_id, models.ObrigacaoAcessoria.empresa_id.type),
+                literal(old.periodicidade, models.ObrigacaoAcessoria.periodicidade.type),
+            ]
+
+        versions = if_match_versions(request, obrigacao_id)
+
+        if versions is not None:
+            stmt = stmt.where(models.ObrigacaoAcessoria.version.in_(versions))
+
+        try:
+            row = (
+                await db.execute(
+                    stmt.values(
+                        **obrigacao.model_dump(),
+                        version=models.ObrigacaoAcessoria.version + 1,
+                        updated_at=models.utcnow(),
+                    ).returning(*returning)
+                )
+            ).one_or_none()
+        except IntegrityError:
+            return await missing_empresa(db, obrigacao.empresa_id)
+
+        if row is None:
+            if (
+                versions is not None
+                and await db.get(models.ObrigacaoAcessoria, obrigacao_id) is not None
+            ):
+                return ORJSONResponse(
+                    {"message": "Obrigação Acessória foi alterada por outra requisição"}, 412
+                )
+
+            return ORJSONResponse({"message": "Obrigação Acessória não encontrada"}, 404)
+
+        orm_obrigacao = row[0]
+
+        await update_due_dates(db, [orm_obrigacao.id])
+        await update_resumos(
+            db,
+            summary_deltas([row[1:]], sign=-1),
+            summary_deltas([(orm_obrigacao.empresa_id, orm_obrigacao.periodicidade)]),
+        )
+        record_eventos(db, "obrigacao", "updated", [orm_obrigacao.id])
+        await db.commit()
+
+        response.headers["ETag"] = resource_etag(orm_obrigacao)
 
-        orm_empresa = db.get(models.Empresa, obrigacao.empresa_id)
+        return orm_obrigacao
 
-        if orm_empresa is None:
-            return JSONResponse(
-                {"message": f"Empresa com id {obrigacao.empresa_id} não existe"}, 400
+    @router.delete("/obrigacoes/{obrigacao_id}", status_code=204)
+    async def delete_obrigacao(obrigacao_id: int, db: AsyncSession = Depends(get_db)):
+        removed = (
+            await db.execute(
+                delete(models.ObrigacaoAcessoria)
+                .where(models.ObrigacaoAcessoria.id == obrigacao_id)
+                .returning(
+                    models.ObrigacaoAcessoria.empresa_id, models.ObrigacaoAcessoria.periodicidade
+                )
             )
+        ).one_or_none()
 
-        for key, value in obrigacao.model_dump().items():
-            setattr(orm_obrigacao, key, value)
+        if removed is None:
+            return ORJSONResponse({"message": "Obrigação Acessória não encontrada"}, 404)
 
-        db.commit()
-        db.refresh(orm_obrigacao)
+        await update_resumos(db, summary_deltas([removed], sign=-1))
+        record_eventos(db, "obrigacao", "deleted", [obrigacao_id])
+        await db.commit()
 
-        return orm_obrigacao
 
-    @router.delete("/obrigacoes/{obrigacao_id}", status_code=204)
-    async def delete_obrigacao(obrigacao_id: int, db: Session = Depends(get_db)):
-        orm_obrigacao = db.get(models.ObrigacaoAcessoria, obrigacao_id)
+class ChangeRoutes:
+    router = APIRouter(tags=["changes"])
 
-        if orm_obrigacao is None:
-            return JSONResponse({"message": "Obrigação Acessória não encontrada"}, 404)
+    @router.get("/changes/stream", response_class=StreamingResponse)
+    async def stream_changes(
+        since: int | None = Query(None, ge=0),
+        recurso: list[Literal["empresa", "obrigacao"]] | None = Query(None),
+        last_event_id: int | None = Header(None, ge=0),
+    ):
+        # EventSource sends Last-Event-ID on reconnect, which wins over the
+        # offset the client first connected with.
+        after = last_event_id if last_event_id is not None else since
+
+        async def eventos():
+            async for evento in feed.stream(after, recurso and set(recurso)):
+                yield sse(evento)
+
+        return StreamingResponse(
+            eventos(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+
+class MetricsRoutes:
+    router = APIRouter(tags=["metrics"])
 
-        db.delete(orm_obrigacao)
-        db.commit()
+    @router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+    async def read_metrics():
+        return PlainTextResponse(
+            REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+        )
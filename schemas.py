@@ -1,4 +1,13 @@
-from pydantic import BaseModel
+from datetime import date, datetime
+from typing import Annotated, Generic, Literal, TypeVar
+
+from pydantic import AfterValidator, BaseModel, ConfigDict
+
+from cnpj import normalize_cnpj
+
+CNPJ = Annotated[str, AfterValidator(normalize_cnpj)]
+
+T = TypeVar("T")
 
 
 class EmpresaBase(BaseModel):
@@ -11,13 +20,23 @@ class EmpresaBase(BaseModel):
 
 class Empresa(EmpresaBase):
     id: int
+    version: int
+    updated_at: datetime
 
-    class Config:
-        orm_model = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class EmpresaCreate(EmpresaBase):
-    pass
+    # Only input is validated: rows stored before validation existed must
+    # still be readable.
+    cnpj: CNPJ
+
+
+class EmpresaBulkResult(BaseModel):
+    index: int
+    cnpj: str
+    id: int | None
+    status: Literal["inserted", "updated", "conflict"]
 
 
 class EmpresaUpdate(BaseModel):
@@ -31,13 +50,15 @@ class ObrigacaoAcessoriaBase(BaseModel):
     nome: str
     periodicidade: str
     empresa_id: int
+    data_vencimento: date | None = None
 
 
 class ObrigacaoAcessoria(ObrigacaoAcessoriaBase):
     id: int
+    version: int
+    updated_at: datetime
 
-    class Config:
-        orm_model = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class ObrigacaoAcessoriaCreate(ObrigacaoAcessoriaBase):
@@ -46,3 +67,56 @@ class ObrigacaoAcessoriaCreate(ObrigacaoAcessoriaBase):
 
 class ObrigacaoAcessoriaUpdate(ObrigacaoAcessoriaBase):
     pass
+
+
+class EmpresaComObrigacoes(Empresa):
+    obrigacoes: list[ObrigacaoAcessoria]
+
+
+class Batch(BaseModel, Generic[T]):
+    items: list[T]
+    not_found: list[int]
+
+
+class Changes(BaseModel, Generic[T]):
+    items: list[T]
+    deleted: list[int]
+    since: str
+    has_more: bool
+
+
+class BulkDeleteResult(BaseModel):
+    deleted: int
+
+
+class ObrigacaoAcessoriaBulkResult(BaseModel):
+    index: int
+    id: int | None
+    status: Literal["created", "error"]
+    message: str | None = None
+
+
+class Vencimento(BaseModel):
+    data: date
+    obrigacao: ObrigacaoAcessoria
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class EmpresaResumo(BaseModel):
+    empresa_id: int
+    mensal: int
+    trimestral: int
+    anual: int
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class Evento(BaseModel):
+    id: int
+    recurso: Literal["empresa", "obrigacao"]
+    recurso_id: int
+    operacao: Literal["created", "updated", "deleted"]
+    criado_em: datetime
+
+    model_config = ConfigDict(from_attributes=True)
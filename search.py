@@ -0,0 +1,90 @@
+import re
+
+from sqlalchemy import Float, column, func, literal, literal_column, or_, select, table
+
+import models
+
+EMPRESAS_BUSCA = table("empresas_busca", column("rowid"), column("rank"))
+
+
+def digits(value):
+    return re.sub(r"\D", "", value)
+
+
+def cnpj_prefix(q):
+    if re.fullmatch(r"[\d\s./-]+", q) and digits(q):
+        return digits(q)
+
+    return None
+
+
+def escape_like(value):
+    return re.sub(r"([\\%_])", r"\\\1", value)
+
+
+def prefix_upper_bound(prefix):
+    # The bound stays inside the digits: ':' follows '9' in bytes, but ICU and
+    # glibc collations sort it before them. All 9s have no upper bound.
+    base = prefix.rstrip("9")
+
+    if not base:
+        return None
+
+    return base[:-1] + str(int(base[-1]) + 1)
+
+
+def search_cnpj(prefix):
+    # A range on the digits uses the plain btree index on every backend,
+    # unlike LIKE 'prefix%' which needs text_pattern_ops or NOCASE tricks.
+    end = prefix_upper_bound(prefix)
+    score = literal(1.0, Float)
+
+    stmt = select(models.Empresa, score.label("score")).where(models.Empresa.cnpj >= prefix)
+
+    if end is not None:
+        stmt = stmt.where(models.Empresa.cnpj < end)
+
+    return stmt, score
+
+
+def search_postgresql(q):
+    pattern = f"%{escape_like(q)}%"
+    score = func.greatest(
+        func.similarity(models.Empresa.nome, q), func.similarity(models.Empresa.email, q)
+    )
+
+    stmt = select(models.Empresa, score.label("score")).where(
+        or_(
+            models.Empresa.nome.ilike(pattern, escape="\\"),
+            models.Empresa.email.ilike(pattern, escape="\\"),
+            models.Empresa.nome.op("%")(q),
+        )
+    )
+
+    return stmt, score
+
+
+def search_sqlite(q):
+    terms = re.findall(r"\w+", q.lower())
+    query = " ".join(f'"{term}"*' for term in terms)
+    score = -EMPRESAS_BUSCA.c.rank
+
+    stmt = (
+        select(models.Empresa, score.label("score"))
+        .join(EMPRESAS_BUSCA, EMPRESAS_BUSCA.c.rowid == models.Empresa.id)
+        .where(literal_column("empresas_busca").match(query))
+    )
+
+    return stmt, score
+
+
+def search_query(db, q):
+    prefix = cnpj_prefix(q)
+
+    if prefix is not None:
+        return search_cnpj(prefix)
+
+    if db.bind.dialect.name == "postgresql":
+        return search_postgresql(q)
+
+    return search_sqlite(q)
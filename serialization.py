@@ -0,0 +1,23 @@
+from functools import cache
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+
+@cache
+def adapter(schema):
+    return TypeAdapter(schema)
+
+
+def orm_response(schema, content, response=None, status_code=200):
+    # Validates the ORM rows once and dumps straight to JSON bytes, skipping
+    # FastAPI's validate -> dict -> encode round trip for response_model.
+    type_adapter = adapter(schema)
+    body = type_adapter.dump_json(type_adapter.validate_python(content, from_attributes=True))
+
+    return Response(
+        body,
+        status_code,
+        headers=response.headers if response is not None else None,
+        media_type="application/json",
+    )
@@ -1,12 +1,25 @@
 from fastapi import FastAPI
-from fastapi.responses import RedirectResponse
+from fastapi.responses import ORJSONResponse, RedirectResponse
 
-from routes import EmpresaRoutes, ObrigacaoAcessoriaRoutes
+from compression import CompressionMiddleware
+from database import engine
+from metrics import MetricsMiddleware
+from profiling import DBIDE_PROFILE, install
+from replicas import ReadYourWritesMiddleware
+from routes import ChangeRoutes, EmpresaRoutes, MetricsRoutes, ObrigacaoAcessoriaRoutes
 
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(ReadYourWritesMiddleware)
+
+if DBIDE_PROFILE:
+    install(app, engine)
 
 app.include_router(EmpresaRoutes.router)
 app.include_router(ObrigacaoAcessoriaRoutes.router)
+app.include_router(ChangeRoutes.router)
+app.include_router(MetricsRoutes.router)
 
 
 @app.get("/")
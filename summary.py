@@ -0,0 +1,56 @@
+from collections import Counter, defaultdict
+
+import models
+from database import dialect_insert
+
+COLUMNS = [periodicidade.value for periodicidade in models.ObrigacaoAcessoria.Periodicidade]
+
+
+def summary_deltas(obrigacoes, sign=1):
+    deltas = defaultdict(Counter)
+
+    for empresa_id, periodicidade in obrigacoes:
+        if empresa_id is not None:
+            deltas[empresa_id][models.ObrigacaoAcessoria.Periodicidade(periodicidade).value] += (
+                sign
+            )
+
+    return deltas
+
+
+async def create_resumos(db, empresa_ids):
+    if empresa_ids:
+        await db.execute(
+            dialect_insert(db, models.EmpresaResumo).on_conflict_do_nothing(),
+            [{"empresa_id": empresa_id} for empresa_id in empresa_ids],
+        )
+
+
+async def update_resumos(db, *deltas):
+    total = defaultdict(Counter)
+
+    for delta in deltas:
+        for empresa_id, counts in delta.items():
+            total[empresa_id].update(counts)
+
+    rows = [
+        {"empresa_id": empresa_id, **{column: counts[column] for column in COLUMNS}}
+        for empresa_id, counts in total.items()
+        if any(counts.values())
+    ]
+
+    if not rows:
+        return
+
+    stmt = dialect_insert(db, models.EmpresaResumo)
+
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[models.EmpresaResumo.empresa_id],
+            set_={
+                column: getattr(models.EmpresaResumo, column) + stmt.excluded[column]
+                for column in COLUMNS
+            },
+        ),
+        rows,
+    )
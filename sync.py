@@ -0,0 +1,66 @@
+from sqlalchemy import func, select, tuple_
+
+import models
+from pagination import decode_cursor, encode_cursor
+
+
+class ExpiredToken(Exception):
+    pass
+
+
+def changed_rows(model, seq, after, limit):
+    return (
+        select(model)
+        .where(tuple_(model.seq, model.id) > tuple_(seq, after))
+        .order_by(model.seq, model.id)
+        .limit(limit)
+    )
+
+
+def deleted_rows(recurso, watermark, limit):
+    return (
+        select(models.Evento.id, models.Evento.recurso_id)
+        .where(
+            models.Evento.recurso == recurso,
+            models.Evento.operacao == "deleted",
+            models.Evento.id > watermark,
+        )
+        .order_by(models.Evento.id)
+        .limit(limit)
+    )
+
+
+async def read_changes(db, model, recurso, since, limit):
+    # Rows are paged by (seq, id) and deletions by their outbox event id past
+    # a watermark. A row's seq is the id of its own last event, so both share
+    # one ordering. An initial sync starts the watermark at the newest event:
+    # rows deleted before that were never sent, and the ones deleted while
+    # paging come back as tombstones even if older events get pruned.
+    if since is None:
+        seq, after = 0, 0
+        watermark = await db.scalar(select(func.max(models.Evento.id))) or 0
+    else:
+        seq, after, watermark = decode_cursor(since, (int, int, int))
+        first = await db.scalar(select(func.min(models.Evento.id)))
+
+        if first is not None and first > watermark + 1:
+            raise ExpiredToken(since)
+
+    rows = await db.scalars(changed_rows(model, seq, after, limit + 1))
+    tombstones = await db.execute(deleted_rows(recurso, watermark, limit + 1))
+
+    changes = [(row.seq, row.id, row) for row in rows]
+    changes += [(evento_id, id, None) for evento_id, id in tombstones]
+    changes.sort(key=lambda change: change[:2])
+    page = changes[:limit]
+
+    if page:
+        seq, after = page[-1][:2]
+        watermark = max(watermark, seq)
+
+    return (
+        [row for _, _, row in page if row is not None],
+        [id for _, id, row in page if row is None],
+        encode_cursor(seq, after, watermark),
+        len(changes) > limit,
+    )